@@ -0,0 +1,86 @@
+"""
+Contains the scripting interface of bookGen.
+"""
+
+from contextlib import contextmanager
+import logging
+
+import bpy
+
+log = logging.getLogger("bookGen.api")
+
+# nesting depth of batch_edit per scene and the scenes with deferred rebuilds, keyed by scene pointer
+_batch_depth = {}
+_deferred = set()
+
+
+def is_batch_editing(scene):
+    """Checks if a scene is inside a batch_edit block
+
+    Args:
+        scene (bpy.types.Scene): the scene
+
+    Returns:
+        bool: True if rebuilds of the scene are deferred, otherwise False
+    """
+    return _batch_depth.get(scene.as_pointer(), 0) > 0
+
+
+def defer_rebuild(scene):
+    """Called by the property update callbacks. Remembers the rebuild if the scene is inside a batch_edit block.
+
+    Args:
+        scene (bpy.types.Scene): the scene whose settings changed
+
+    Returns:
+        bool: True if the rebuild was deferred and must not run now, otherwise False
+    """
+    if not is_batch_editing(scene):
+        return False
+    _deferred.add(scene.as_pointer())
+    return True
+
+
+def rebuild(scene, dirty_only=True):
+    """Rebuilds the books of a scene
+
+    Args:
+        scene (bpy.types.Scene): the scene
+        dirty_only (bool, optional): only rebuild groupings whose parameters changed. Defaults to True.
+    """
+    with bpy.context.temp_override(scene=scene):
+        bpy.ops.bookgen.rebuild(dirty_only=dirty_only)
+
+
+@contextmanager
+def batch_edit(scene):
+    """Defers all rebuilds triggered by changing bookGen properties of a scene.
+    When the outermost block exits a single dirty-only rebuild runs if any change would have triggered one.
+    If the block raises, no rebuild runs and the changed groupings are rebuilt by the next rebuild.
+
+    Example:
+        with bookGen.api.batch_edit(bpy.context.scene):
+            settings.book_height = 0.3
+            settings.lean_amount = 0.5
+
+    Args:
+        scene (bpy.types.Scene): the scene that is edited
+
+    Yields:
+        bpy.types.Scene: the scene
+    """
+    key = scene.as_pointer()
+    _batch_depth[key] = _batch_depth.get(key, 0) + 1
+    completed = False
+    try:
+        yield scene
+        completed = True
+    finally:
+        _batch_depth[key] -= 1
+        if _batch_depth[key] == 0:
+            del _batch_depth[key]
+            deferred = key in _deferred
+            _deferred.discard(key)
+            if deferred and completed and scene.BookGenAddonProperties.auto_rebuild:
+                log.info("Running deferred rebuild")
+                rebuild(scene, dirty_only=True)
@@ -20,179 +20,157 @@
 This file contains the book class
 """
 
-from math import radians, atan
+import numpy as np
 
 import bpy
-import bmesh
 from mathutils import Vector, Matrix
 
-from .data.vertices import get_vertices
-from .data.faces import get_faces
-from .data.uvs import get_uvs
-from .data.creases import get_creases
+from .core import find_archetypes
+from .core.stats import measure
+from .core.template import VERTEX_COUNT
+from .mesh import MeshPool, UpdateJournal, add_subsurf, set_subsurf
+from .utils import compose_book_name
 
 
 class Book:
     """
-    This stores information about a single book. It can export the book as blender object
-    or return the raw geometry for previz.
+    This exports a single book of a batch computed by the layout core as blender object.
     """
 
     def __init__(
         self,
-        cover_height,
-        cover_thickness,
-        cover_depth,
-        page_height,
-        page_depth,
-        page_thickness,
-        spine_curl,
-        hinge_inset,
-        hinge_width,
-        lean=0,
-        lean_angle=0,
+        batch,
+        index,
+        name="book",
         subsurf=False,
         cover_material=None,
         page_material=None,
     ):
-        self.height = cover_height
-        self.width = page_thickness + 2 * cover_thickness
-        self.depth = cover_depth
-        self.lean_angle = lean_angle
-        self.lean = lean
-        self.page_thickness = page_thickness
-        self.page_height = page_height
-        self.page_depth = page_depth
-        self.cover_depth = cover_depth
-        self.cover_height = cover_height
-        self.cover_thickness = cover_thickness
-        self.hinge_inset = hinge_inset
-        self.hinge_width = hinge_width
-        self.spine_curl = spine_curl
+        self.batch = batch
+        self.index = index
+        self.name = name
         self.subsurf = subsurf
         self.cover_material = cover_material
         self.page_material = page_material
-        self.location = Vector([0, 0, 0])
-        self.rotation = Vector([0, 0, 0])
 
         self.obj = None
 
-        self.vertices = get_vertices(
-            page_thickness,
-            page_height,
-            cover_depth,
-            cover_height,
-            cover_thickness,
-            page_depth,
-            hinge_inset,
-            hinge_width,
-            spine_curl,
-        )
-        self.faces = get_faces()
-
-    def to_object(self, with_uvs=False):
+    def to_object(self, with_uvs=False, mesh_pool=None, archetypes=None):
         """
         Exports the book as a blender object
+
+        Args:
+            with_uvs (bool, optional): Whether to generate UVs for the book. Defaults to False.
+            mesh_pool (MeshPool, optional): shares meshes between identical books. Defaults to None.
+            archetypes (Archetypes, optional): if given, the book uses the scaled mesh of its archetype.
+                Defaults to None.
         """
+        if mesh_pool is None:
+            mesh_pool = MeshPool(self.name, with_uvs, self.cover_material, self.page_material)
 
-        def index_to_vert(face):
-            lst = []
-            for i in face:
-                lst.append(vert_ob[i])
-            return tuple(lst)
-
-        mesh = bpy.data.meshes.new("book")
-
-        creases = get_creases()
-
-        if with_uvs:
-            uvs = get_uvs(
-                self.page_thickness,
-                self.page_height,
-                self.cover_depth,
-                self.cover_height,
-                self.cover_thickness,
-                self.page_depth,
-                self.hinge_inset,
-                self.hinge_width,
-                self.spine_curl,
-            )
-
-        self.obj = bpy.data.objects.new("book", mesh)
-
-        bm = bmesh.new()
-        bm.from_mesh(mesh)
-        vert_ob = []
-        for vert in self.vertices:
-            vert_ob.append(bm.verts.new(vert))
-
-        bm.verts.index_update()
-        bm.verts.ensure_lookup_table()
-
-        crease_layer = bm.edges.layers.float.new("crease_edge")
-        for crease in creases:
-            edge = bm.edges.new((bm.verts[crease[0]], bm.verts[crease[1]]))
-            edge[crease_layer] = 1.0
-
-        for face_index in self.faces:
-            face = bm.faces.new(index_to_vert(face_index))
-            face.smooth = True
-
-        bm.faces.index_update()
-        bm.edges.ensure_lookup_table()
-
-        if with_uvs:
-            uv_layer = bm.loops.layers.uv.verify()
-            for face, face_uvs in zip(bm.faces, uvs):
-                for loop, uv in zip(face.loops, face_uvs):
-                    loop_uv = loop[uv_layer]
-                    loop_uv.uv.x = uv[0]
-                    loop_uv.uv.y = uv[1]
-
-        bm.normal_update()
+        if archetypes is None:
+            mesh = mesh_pool.get_mesh(self.batch, self.index)
+        else:
+            mesh = mesh_pool.get_mesh(archetypes.batch, int(archetypes.indices[self.index]))
 
+        self.obj = bpy.data.objects.new(self.name, mesh)
         if self.subsurf:
-            self.obj.modifiers.new("Subdivision Surface", type="SUBSURF")
-            self.obj.modifiers["Subdivision Surface"].levels = 1
-
-        if self.cover_material:
-            if self.obj.data.materials:
-                self.obj.data.materials[0] = self.cover_material
-            else:
-                self.obj.data.materials.append(self.cover_material)
-
-        if self.page_material:
-            self.obj.data.materials.append(self.page_material)
-            bm.faces.ensure_lookup_table()
-            bm.faces[0].material_index = 1
-            bm.faces[1].material_index = 1
-            bm.faces[2].material_index = 1
-            bm.faces[3].material_index = 1
-
-        self.obj.matrix_world = Matrix.Translation(self.location) @ self.rotation.to_4x4()
-
-        bm.to_mesh(mesh)
-        bm.free()
-
-        # calculate auto smooth angle based on spine
-        center = self.vertices[-1]
-        side = self.vertices[-5]
-        curl = abs(center[1] - side[1])
-        width = abs(center[0] - side[0])
-        spine_angle = atan(width / curl) * 2
-        normal_angle = radians(180) - spine_angle + radians(1)  # add 1 deg to account for fp
-
-        if bpy.app.version >= (4,1,0):
-            mesh.set_sharp_from_angle(angle=normal_angle)
-        else:
-            mesh.use_auto_smooth = True
-            mesh.auto_smooth_angle = normal_angle
+            add_subsurf(self.obj)
+
+        location = Vector(self.batch.locations[self.index].tolist())
+        rotation = Matrix(self.batch.rotations[self.index].tolist())
+        matrix_world = Matrix.Translation(location) @ rotation.to_4x4()
+        if archetypes is not None:
+            # the scale absorbs the difference between the archetype and the book
+            matrix_world = matrix_world @ Matrix.Diagonal(archetypes.scales[self.index].tolist()).to_4x4()
+        self.obj.matrix_world = matrix_world
 
         return self.obj
 
-    def get_geometry(self):
-        """
-        Returns the raw geometry of a book
-        """
-        transformed_verts = map(lambda v: self.rotation @ Vector(v) + self.location, self.vertices)
-        return transformed_verts, self.faces
+
+def update_books(
+    collection,
+    batch,
+    with_uvs=False,
+    subsurf=False,
+    cover_material=None,
+    page_material=None,
+    tolerance=0.0,
+):
+    """Updates the book objects of a grouping in place.
+
+    The existing objects are reused in the order of the collection, so they are matched independently of their names.
+    Only their meshes, uvs and transforms are overwritten. Objects are only added or removed at the end
+    if the number of books changed. If the update fails, the previous books are restored.
+
+    Args:
+        collection (bpy.types.Collection): the collection of the grouping
+        batch (BookBatch): the new books
+        with_uvs (bool, optional): whether to generate uvs. Defaults to False.
+        subsurf (bool, optional): whether the books have a subdivision surface modifier. Defaults to False.
+        cover_material (bpy.types.Material, optional): the material of the covers. Defaults to None.
+        page_material (bpy.types.Material, optional): the material of the pages. Defaults to None.
+        tolerance (float, optional): the maximum shape error of shared meshes. Defaults to 0.
+
+    Returns:
+        bool: False if the collection does not consist of separate book objects. Nothing is changed in that case.
+    """
+    if collection.BookGenGroupingProperties.archetypes is not None:
+        return False
+
+    objects = list(collection.objects)
+    meshes = {}
+    for obj in objects:
+        if obj.type != "MESH" or len(obj.data.vertices) != VERTEX_COUNT or "book_id" in obj.data.attributes:
+            return False
+        meshes[obj.data.as_pointer()] = obj.data
+
+    # everything that does not touch blender data is computed first
+    archetypes = find_archetypes(batch, tolerance) if tolerance > 0 else None
+    matrices = batch.get_matrices(None if archetypes is None else archetypes.scales)
+    # matrix_world is stored column-major
+    matrices = np.ascontiguousarray(matrices.transpose(0, 2, 1)).reshape(-1)
+    journal = UpdateJournal()
+    mesh_pool = MeshPool(
+        collection.name, with_uvs, cover_material, page_material, reusable=meshes.values(), journal=journal
+    )
+    mesh_pool.prepare(batch if archetypes is None else archetypes.batch)
+
+    books = []
+    try:
+        with measure("to_object"):
+            for index in range(len(batch)):
+                if archetypes is None:
+                    mesh = mesh_pool.get_mesh(batch, index)
+                else:
+                    mesh = mesh_pool.get_mesh(archetypes.batch, int(archetypes.indices[index]))
+
+                if index < len(objects):
+                    obj = objects[index]
+                    journal.backup_object(obj)
+                    obj.data = mesh
+                else:
+                    obj = bpy.data.objects.new(compose_book_name(collection.name, index), mesh)
+                    journal.add_created(obj)
+                    with measure("linking"):
+                        collection.objects.link(obj)
+                set_subsurf(obj, subsurf)
+                books.append(obj)
+
+            if books:
+                # the books are the first objects of the collection in order, the unused ones keep their transforms
+                all_matrices = journal.backup_matrices(collection).copy()
+                all_matrices[: len(matrices)] = matrices
+                collection.objects.foreach_set("matrix_world", all_matrices)
+                # raw access does not run the property update, so the transforms are not tagged for the depsgraph
+                for obj in books:
+                    obj.update_tag(refresh={"OBJECT"})
+    except BaseException:
+        # restores the previous books, so a failed or interrupted update does not leave them half overwritten
+        journal.rollback()
+        raise
+
+    with measure("cleanup"):
+        bpy.data.batch_remove(objects[len(books) :] + mesh_pool.reusable)
+
+    return True
@@ -0,0 +1,15 @@
+"""
+The layout core of bookGen. It computes the parameters and transforms of books in a grouping.
+It only depends on python and NumPy, so it can be profiled and benchmarked outside of blender.
+"""
+
+from .archetypes import Archetypes, find_archetypes
+from .batch import BookBatch
+from .template import GEOMETRY_PARAMETERS, compute_vertices
+from .topology import FACES, LOOP_VERTICES, LOOP_TOTALS, EDGE_KEYS, CREASE_EDGES, PAGE_FACE_MASK
+from .uvs import UVCache, compute_uvs
+from .shelf import ShelfLayout
+from .stack import StackLayout
+from .streams import BookStreams
+from .sampling import sample_book_parameters, sample_books
+from .sequence import BookSequence, ShelfSequence, StackSequence
@@ -0,0 +1,118 @@
+"""
+Contains the clustering of books into archetypes.
+
+Books whose shapes differ by less than a maximum error share the mesh of an archetype.
+The archetype is scaled along the axes of the book so that its outer dimensions match the book exactly.
+"""
+
+import logging
+
+import numpy as np
+
+from .batch import BookBatch
+from .template import GEOMETRY_PARAMETERS, compute_vertices
+
+log = logging.getLogger("bookGen.core.archetypes")
+
+# The axis of the book each parameter of GEOMETRY_PARAMETERS extends along. 0: width, 1: depth, 2: height
+PARAMETER_AXES = np.array([0, 2, 1, 2, 0, 1, 0, 1, 1])
+
+
+def get_dimensions(parameters):
+    """Returns the outer dimensions of books
+
+    Args:
+        parameters (numpy.ndarray): the shape parameters (n, 9) in the order of GEOMETRY_PARAMETERS
+
+    Returns:
+        numpy.ndarray: the width, depth and height of each book (n, 3)
+    """
+    p = {name: parameters[:, i] for i, name in enumerate(GEOMETRY_PARAMETERS)}
+    return np.column_stack((p["page_thickness"] + 2 * p["cover_thickness"], p["cover_depth"], p["cover_height"]))
+
+
+class Archetypes:
+    """
+    Maps the books of a batch to a small set of archetype shapes.
+    """
+
+    def __init__(self, parameters, indices, scales):
+        """
+        Args:
+            parameters (numpy.ndarray): the shape parameters of the archetypes (k, 9)
+            indices (numpy.ndarray): the archetype of each book (n,)
+            scales (numpy.ndarray): the scale that maps the archetype to each book (n, 3)
+        """
+        parameters = np.asarray(parameters).reshape(-1, len(GEOMETRY_PARAMETERS))
+        count = len(parameters)
+        self.batch = BookBatch(parameters, np.zeros((count, 3)), np.broadcast_to(np.identity(3), (count, 3, 3)))
+        self.indices = np.ascontiguousarray(indices, dtype=np.int32)
+        self.scales = np.ascontiguousarray(scales, dtype=np.float32).reshape(-1, 3)
+
+    def __len__(self):
+        return len(self.batch)
+
+
+def _unique_rows(parameters):
+    """Groups identical parameter vectors
+
+    Args:
+        parameters (numpy.ndarray): the shape parameters (n, 9)
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): the unique parameters and the index of each book into them
+    """
+    unique, indices = np.unique(parameters, axis=0, return_inverse=True)
+    return unique, indices.reshape(-1)
+
+
+def find_archetypes(batch, tolerance=0.0):
+    """Clusters the books of a batch into archetypes.
+    The vertices of a scaled archetype differ by at most the tolerance from the vertices of its books.
+
+    Args:
+        batch (BookBatch): the books
+        tolerance (float, optional): the maximum error in meters. Only identical books share an archetype if it is 0.
+
+    Returns:
+        Archetypes: the archetypes of the books
+    """
+    parameters = batch.parameters
+    if len(parameters) == 0 or tolerance <= 0:
+        unique, indices = _unique_rows(parameters)
+        return Archetypes(unique, indices, np.ones((len(parameters), 3)))
+
+    parameters = parameters.astype(np.float64)
+    dimensions = get_dimensions(parameters)
+
+    # the parameters relative to the dimension of their axis are independent of the scale of the book
+    relative = parameters / dimensions[:, PARAMETER_AXES]
+    cell_size = tolerance / dimensions.max(axis=0)[PARAMETER_AXES]
+    keys = np.floor(relative / cell_size).astype(np.int64)
+    _, indices = _unique_rows(keys)
+
+    counts = np.bincount(indices)[:, np.newaxis]
+    mean_relative = np.stack([np.bincount(indices, column) for column in relative.T], axis=1) / counts
+    mean_dimensions = np.stack([np.bincount(indices, column) for column in dimensions.T], axis=1) / counts
+    archetypes = mean_relative * mean_dimensions[:, PARAMETER_AXES]
+    scales = dimensions / mean_dimensions[indices]
+
+    # books that are not represented well enough get an exact archetype
+    vertices = compute_vertices(archetypes)[indices] * scales[:, np.newaxis, :]
+    errors = np.abs(vertices - batch.vertices).max(axis=(1, 2))
+    outliers = errors > tolerance
+    if outliers.any():
+        exact, exact_indices = _unique_rows(parameters[outliers])
+        indices[outliers] = len(archetypes) + exact_indices
+        scales[outliers] = 1
+        archetypes = np.concatenate((archetypes, exact))
+
+    used, indices = np.unique(indices, return_inverse=True)
+    log.debug(
+        "%d books share %d archetypes (%d exact) at a tolerance of %.4f",
+        len(parameters),
+        len(used),
+        np.count_nonzero(outliers),
+        tolerance,
+    )
+    return Archetypes(archetypes[used], indices.reshape(-1), scales)
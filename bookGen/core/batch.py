@@ -0,0 +1,125 @@
+"""
+This file contains the blender-independent description of the books of a grouping.
+"""
+
+import numpy as np
+
+from .template import GEOMETRY_PARAMETERS, compute_vertices
+from .topology import FACES
+from .uvs import uv_cache
+
+
+class BookBatch:
+    """
+    This stores the shape and the transform of many books as contiguous float32 arrays.
+    It does not depend on blender and is consumed by the grouping classes to create objects and previews.
+    """
+
+    def __init__(self, parameters, locations, rotations):
+        """
+        Args:
+            parameters (numpy.ndarray): the shape parameters (n, 9) in the order of GEOMETRY_PARAMETERS
+            locations (numpy.ndarray): the locations of the books (n, 3)
+            rotations (numpy.ndarray): the rotations of the books (n, 3, 3)
+        """
+        self.parameters = np.ascontiguousarray(parameters, dtype=np.float32).reshape(-1, len(GEOMETRY_PARAMETERS))
+        self.locations = np.ascontiguousarray(locations, dtype=np.float32).reshape(-1, 3)
+        self.rotations = np.ascontiguousarray(rotations, dtype=np.float32).reshape(-1, 3, 3)
+        self._vertices = None
+        self._uvs = None
+
+    @classmethod
+    def from_books(cls, books, locations, rotations):
+        """Creates a batch from sampled book parameters
+
+        Args:
+            books (Dict[str, numpy.ndarray]): the parameters of the books as arrays
+            locations (numpy.ndarray): the locations of the books (n, 3)
+            rotations (numpy.ndarray): the rotations of the books (n, 3, 3)
+
+        Returns:
+            BookBatch: the batch of books
+        """
+        parameters = np.column_stack([books[name] for name in GEOMETRY_PARAMETERS])
+        return cls(parameters, locations, rotations)
+
+    @classmethod
+    def empty(cls):
+        """Returns a batch without books
+
+        Returns:
+            BookBatch: the empty batch
+        """
+        return cls(np.zeros((0, len(GEOMETRY_PARAMETERS))), np.zeros((0, 3)), np.zeros((0, 3, 3)))
+
+    def __len__(self):
+        return len(self.parameters)
+
+    def get_parameter(self, name):
+        """Returns a single shape parameter of all books
+
+        Args:
+            name (str): the name of the parameter. One of GEOMETRY_PARAMETERS
+
+        Returns:
+            numpy.ndarray: a view of the parameter column
+        """
+        return self.parameters[:, GEOMETRY_PARAMETERS.index(name)]
+
+    @property
+    def widths(self):
+        """numpy.ndarray: the widths of the books"""
+        return self.get_parameter("page_thickness") + 2 * self.get_parameter("cover_thickness")
+
+    @property
+    def vertices(self):
+        """numpy.ndarray: the object-space vertices of all books (n, 44, 3). They are computed on first access."""
+        if self._vertices is None:
+            self._vertices = compute_vertices(self.parameters)
+        return self._vertices
+
+    @property
+    def uvs(self):
+        """numpy.ndarray: the uvs of all books (n, 152, 2) in the order of the face loops.
+        They are computed on first access and shared between books with the same dimensions."""
+        if self._uvs is None:
+            self._uvs = uv_cache.get_uvs(self.parameters)
+        return self._uvs
+
+    def get_world_vertices(self):
+        """Returns the vertices of all books in world-space
+
+        Returns:
+            numpy.ndarray: the vertices (n, 44, 3)
+        """
+        return np.matmul(self.vertices, self.rotations.transpose(0, 2, 1)) + self.locations[:, np.newaxis, :]
+
+    def get_matrices(self, scales=None):
+        """Returns the object transforms of all books
+
+        Args:
+            scales (numpy.ndarray, optional): an additional local scale of each book (n, 3). Defaults to None.
+
+        Returns:
+            numpy.ndarray: the row-major 4x4 matrices (n, 4, 4)
+        """
+        matrices = np.zeros((len(self), 4, 4), dtype=np.float32)
+        matrices[:, :3, :3] = self.rotations
+        if scales is not None:
+            matrices[:, :3, :3] *= scales[:, np.newaxis, :]
+        matrices[:, :3, 3] = self.locations
+        matrices[:, 3, 3] = 1
+        return matrices
+
+    def get_geometry(self):
+        """Returns the raw geometry of all books merged into a single mesh
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): the vertices (n, 3) and the face indices (m, 4)
+        """
+        if len(self) == 0:
+            return np.zeros((0, 3), dtype=np.float32), np.zeros((0, 4), dtype=np.int32)
+
+        vertices = self.get_world_vertices()
+        offsets = np.arange(len(self), dtype=np.int32)[:, np.newaxis, np.newaxis] * vertices.shape[1]
+        return vertices.reshape(-1, 3), (FACES[np.newaxis] + offsets).reshape(-1, 4)
@@ -0,0 +1,122 @@
+"""
+Contains the vectorized computation of the offsets between leaning books on a shelf.
+"""
+
+import numpy as np
+
+HALF_PI = np.pi / 2
+
+
+def corner_heights(lean_angle, height, width):
+    """Returns the height of the upper left and right corner of leaning books
+
+    Args:
+        lean_angle (numpy.ndarray): the lean angles of the books
+        height (numpy.ndarray): the heights of the books
+        width (numpy.ndarray): the widths of the books
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): the heights of the left and the right corners
+    """
+    upright = np.cos(lean_angle) * height
+    raised = upright + np.sin(np.abs(lean_angle)) * width
+    leaning_right = lean_angle > 0
+    return np.where(leaning_right, raised, upright), np.where(leaning_right, upright, raised)
+
+
+def first_offset(lean_angle, height, width):
+    """Returns the offset of the first book of a shelf
+
+    Args:
+        lean_angle (float): the lean angle of the book
+        height (float): the height of the book
+        width (float): the width of the book
+
+    Returns:
+        float: the offset of the book
+    """
+    if lean_angle >= 0:
+        return np.cos(lean_angle) * width
+    return height * np.sin(abs(lean_angle))
+
+
+def lean_offsets(last_angle, last_height, last_width, angle, height, width):
+    """Computes the offset between each pair of neighboring books
+
+    Args:
+        last_angle (numpy.ndarray): the lean angles of the left books of each pair
+        last_height (numpy.ndarray): the heights of the left books of each pair
+        last_width (numpy.ndarray): the widths of the left books of each pair
+        angle (numpy.ndarray): the lean angles of the right books of each pair
+        height (numpy.ndarray): the heights of the right books of each pair
+        width (numpy.ndarray): the widths of the right books of each pair
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): the offsets of the right books and a mask that is False
+            where the pair hit an unusual case
+    """
+    _, last_right = corner_heights(last_angle, last_height, last_width)
+    left, _ = corner_heights(angle, height, width)
+
+    same_dir = ((last_angle >= 0) & (angle >= 0)) | ((last_angle < 0) & (angle < 0))
+
+    # mirror everything if both books lean to the left
+    mirror = same_dir & (last_angle < 0)
+    l_angle = np.where(mirror, angle, last_angle)
+    l_height = np.where(mirror, height, last_height)
+    l_width = np.where(mirror, width, last_width)
+    l_right = np.where(mirror, left, last_right)
+    c_angle = np.where(mirror, last_angle, angle)
+    c_width = np.where(mirror, last_width, width)
+    c_left = np.where(mirror, last_right, left)
+
+    l_abs = np.abs(l_angle)
+    c_abs = np.abs(c_angle)
+
+    steeper = l_abs >= c_abs
+    case_1 = same_dir & steeper & (l_right <= c_left)
+    case_2 = same_dir & steeper & (l_right > c_left)
+    case_3 = ~same_dir & (l_angle > c_angle)
+    case_4 = ~same_dir & (l_angle < c_angle)
+    case_5 = same_dir & (l_abs < c_abs)
+
+    # in case 3 the books switch roles if the left book is higher
+    switch = l_right > c_left
+    s_abs = np.where(switch, c_abs, l_abs)
+    s_height = np.where(switch, height, l_height)
+    s_right = np.where(switch, c_left, l_right)
+    s_current_abs = np.where(switch, l_abs, c_abs)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        offset_1 = np.sin(l_abs) * l_height - (np.tan(c_abs) * l_right - c_width / np.cos(c_abs))
+        offset_2 = (
+            c_left / np.tan(HALF_PI - l_abs) - (c_left / np.tan(HALF_PI - c_abs)) + c_width / np.cos(c_abs)
+        )
+        offset_3 = np.cos(HALF_PI - s_abs) * s_height + s_right / np.tan(HALF_PI - s_current_abs)
+        offset_4 = np.sin(HALF_PI - l_abs) * l_width - (
+            np.tan(c_abs) * np.sin(l_abs) * l_width - c_width / np.cos(c_abs)
+        )
+        offset_5 = (np.cos(c_angle) * c_width) + (np.sin(c_angle) * c_width / np.tan(HALF_PI - l_angle))
+
+    cases = [case_1, case_2, case_3, case_4, case_5]
+    offsets = np.select(cases, [offset_1, offset_2, offset_3, offset_4, offset_5], default=np.nan)
+    return offsets, np.logical_or.reduce(cases)
+
+
+def extents(lean_angle, height, width):
+    """Returns how far books reach beyond their offset. Books that don't lean are aligned right.
+
+    Args:
+        lean_angle (numpy.ndarray): the lean angles of the books
+        height (numpy.ndarray): the heights of the books
+        width (numpy.ndarray): the widths of the books
+
+    Returns:
+        numpy.ndarray: the extent of each book
+    """
+    return np.select(
+        [lean_angle > 0, lean_angle < 0],
+        [np.sin(np.abs(lean_angle)) * height, np.cos(lean_angle) * width],
+        default=0.0,
+    )
+
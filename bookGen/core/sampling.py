@@ -0,0 +1,138 @@
+"""
+Contains the randomization of book parameters. All books of a chunk are sampled at once.
+"""
+
+from math import ceil
+
+import numpy as np
+
+from .streams import BookStreams
+
+# Properties that are randomized by a factor of +-20%. The order defines the column of the draw.
+RANDOMIZED_PROPERTIES = (
+    "book_height",
+    "book_width",
+    "book_depth",
+    "textblock_offset",
+    "cover_thickness",
+    "spine_curl",
+    "hinge_inset",
+    "hinge_width",
+)
+LEAN_ANGLE_DRAW = len(RANDOMIZED_PROPERTIES)
+LEAN_DRAW = LEAN_ANGLE_DRAW + 1
+LEAN_DIRECTION_DRAW = LEAN_ANGLE_DRAW + 2
+ROTATION_DRAW = LEAN_ANGLE_DRAW + 3
+DRAWS_PER_BOOK = LEAN_ANGLE_DRAW + 4
+
+SHAPE_PARAMETERS = (
+    "cover_height",
+    "cover_thickness",
+    "cover_depth",
+    "page_height",
+    "page_depth",
+    "page_thickness",
+    "spine_curl",
+    "hinge_inset",
+    "hinge_width",
+)
+
+
+def sample_book_parameters(parameters, uniforms):
+    """Applies the randomization to the parameters of multiple books at once.
+    This matches the distributions of drawing every value separately with random.random().
+
+    Args:
+        parameters (Dict[str, any]): the grouping parameters
+        uniforms (numpy.ndarray): uniform random numbers in [0, 1) of shape (n, DRAWS_PER_BOOK)
+
+    Returns:
+        Dict[str, numpy.ndarray]: the book parameters as arrays of length n.
+            Leaning is only sampled for shelves and the z-rotation only for stacks.
+    """
+    p = parameters
+    u = uniforms.T
+
+    factors = np.array([p["rndm_" + name + "_factor"] for name in RANDOMIZED_PROPERTIES])
+    base = p["scale"] * np.array([p[name] for name in RANDOMIZED_PROPERTIES])
+    values = base[:, np.newaxis] * (1 + (u[:LEAN_ANGLE_DRAW] * 0.4 - 0.2) * factors[:, np.newaxis])
+    (
+        book_height,
+        book_width,
+        book_depth,
+        textblock_offset,
+        cover_thickness,
+        spine_curl,
+        hinge_inset,
+        hinge_width,
+    ) = values
+
+    books = {
+        "cover_height": book_height,
+        "cover_thickness": cover_thickness,
+        "cover_depth": book_depth,
+        "page_height": book_height - textblock_offset,
+        "page_depth": book_depth - textblock_offset,
+        "page_thickness": book_width - 2 * cover_thickness,
+        "spine_curl": spine_curl,
+        "hinge_inset": hinge_inset,
+        "hinge_width": hinge_width,
+    }
+
+    if "lean_amount" in p:
+        rndm_lean_angle = (u[LEAN_ANGLE_DRAW] * 0.8 - 0.4) * p["rndm_lean_angle_factor"]
+        lean = p["lean_amount"] > u[LEAN_DRAW]
+        lean_dir_factor = np.where(u[LEAN_DIRECTION_DRAW] > (0.5 - p["lean_direction"] / 2), 1.0, -1.0)
+        books["lean"] = lean
+        books["lean_angle"] = np.where(lean, p["lean_angle"] * (1 + rndm_lean_angle) * lean_dir_factor, 0.0)
+
+    if "rotation" in p:
+        books["z_rotation"] = (u[ROTATION_DRAW] - 0.5) * p["rotation"] * 180
+
+    return books
+
+
+def estimate_book_count(length, parameters):
+    """Estimates how many books are needed to fill the given length.
+    This is used to sample a sufficiently large chunk of books in a single call.
+
+    Args:
+        length (float): the length of the shelf or height of the stack
+        parameters (Dict[str, any]): the grouping parameters
+
+    Returns:
+        int: the estimated number of books
+    """
+    min_width = parameters["scale"] * parameters["book_width"] * (1 - 0.2 * parameters["rndm_book_width_factor"])
+    if min_width <= 0:
+        return 1
+    return min(max(ceil(length / min_width) + 1, 1), 4096)
+
+
+def get_book_streams(parameters):
+    """Returns the random streams of the books of a grouping
+
+    Args:
+        parameters (Dict[str, any]): the grouping parameters
+
+    Returns:
+        BookStreams: the random streams keyed by the seed and the grouping id
+    """
+    return BookStreams(parameters["seed"], parameters.get("grouping_id", 0))
+
+
+def sample_books(parameters, streams, indices, variants=0):
+    """Samples the parameters of arbitrary books of a grouping independently of each other
+
+    Args:
+        parameters (Dict[str, any]): the grouping parameters
+        streams (BookStreams): the random streams of the grouping
+        indices (numpy.ndarray): the indices of the books to sample
+        variants (int or numpy.ndarray, optional): the variant of each book. Changing the variant of a book
+            re-rolls only that book. Defaults to 0.
+
+    Returns:
+        Dict[str, numpy.ndarray]: the book parameters as arrays
+    """
+    return sample_book_parameters(parameters, streams.uniforms(indices, DRAWS_PER_BOOK, variants))
+
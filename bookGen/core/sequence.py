@@ -0,0 +1,204 @@
+"""
+Contains the sequence of books of a grouping.
+
+Every book has its own random stream, so the books of a short grouping are a prefix of the books
+of a longer grouping with the same parameters. A sequence samples books on demand and keeps them,
+so changing the length of a grouping only appends or truncates books.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .leaning import first_offset, lean_offsets, extents
+from .sampling import estimate_book_count, get_book_streams, sample_books
+from .stats import measure
+
+
+class BookSequence(ABC):
+    """
+    Caches the sampled parameters of the books of a grouping.
+    Subclasses compute the offsets of the books and implement fit.
+    """
+
+    log = logging.getLogger("bookGen.core.BookSequence")
+
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.streams = get_book_streams(parameters)
+        self.books = {}
+        self.widths = np.zeros(0)
+        self.count = 0
+
+    def matches(self, parameters):
+        """Checks if the sequence was sampled with the given parameters
+
+        Args:
+            parameters (Dict[str, any]): the grouping parameters
+
+        Returns:
+            bool: True if the sequence can be reused for the parameters
+        """
+        return self.parameters == parameters
+
+    def extend(self, count):
+        """Samples books until the sequence contains at least count books
+
+        Args:
+            count (int): the minimum number of books
+        """
+        if count <= self.count:
+            return
+        with measure("sampling"):
+            books = sample_books(self.parameters, self.streams, np.arange(self.count, count))
+        if self.count == 0:
+            self.books = books
+        else:
+            self.books = {key: np.concatenate((self.books[key], books[key])) for key in self.books}
+        self.widths = self.books["page_thickness"] + 2 * self.books["cover_thickness"]
+        self.count = count
+
+    def get(self, count):
+        """Returns the parameters of the first count books
+
+        Args:
+            count (int): the number of books
+
+        Returns:
+            Dict[str, numpy.ndarray]: the book parameters as arrays
+        """
+        self.extend(count)
+        return {key: values[:count] for key, values in self.books.items()}
+
+    @abstractmethod
+    def fit(self, length):
+        """Finds how many books fit into the given length
+
+        Args:
+            length (float): the length of the shelf or the height of the stack
+
+        Returns:
+            (int, numpy.ndarray): the number of books and the offset of each book
+        """
+
+
+class ShelfSequence(BookSequence):
+    """
+    Caches the sampled books of a shelf and their offsets along the shelf.
+    """
+
+    def __init__(self, parameters):
+        super().__init__(parameters)
+        self.cur_offsets = np.zeros(0)
+        self.cur_widths = np.zeros(0)
+        self.valid = np.zeros(0, dtype=bool)
+
+    def extend(self, count):
+        start = self.count
+        super().extend(count)
+        if self.count == start:
+            return
+
+        # the offset of a book only depends on its left neighbor
+        first = max(start - 1, 0)
+        angle = self.books["lean_angle"][first:]
+        height = self.books["cover_height"][first:]
+        width = self.widths[first:]
+        offsets, valid = lean_offsets(angle[:-1], height[:-1], width[:-1], angle[1:], height[1:], width[1:])
+
+        if start == 0:
+            previous = first_offset(angle[0], height[0], width[0])
+            cur_offsets = np.cumsum(np.concatenate(([previous], offsets)))
+            previous_offsets = cur_offsets[:-1]
+        else:
+            cur_offsets = np.cumsum(np.concatenate(([self.cur_offsets[-1]], offsets)))[1:]
+            previous_offsets = np.concatenate(([self.cur_offsets[-1]], cur_offsets[:-1]))
+
+        cur_widths = previous_offsets + (offsets + extents(angle[1:], height[1:], width[1:]))
+
+        self.cur_offsets = np.concatenate((self.cur_offsets, cur_offsets))
+        self.cur_widths = np.concatenate((self.cur_widths, cur_widths))
+        self.valid = np.concatenate((self.valid, valid))
+
+    def fit(self, length):
+        """Finds how many books fit on a shelf of the given length.
+        The first book is always added.
+
+        Args:
+            length (float): the length of the shelf
+
+        Returns:
+            (int, numpy.ndarray): the number of books and the offset of each book along the shelf
+        """
+        if self.count == 0:
+            self.extend(estimate_book_count(length, self.parameters))
+
+        while True:
+            # cur_widths[i] is the width of the shelf including book i + 1.
+            # A comparison with NaN is False, which stops the shelf just like the unusual cases.
+            stop = ~self.valid | ~(self.cur_widths < length)
+            if stop.any():
+                break
+            self.log.debug("%d books do not fill the shelf. Sampling more books.", self.count)
+            self.extend(2 * self.count)
+
+        count = int(np.argmax(stop)) + 1
+        if not self.valid[count - 1]:
+            self.log.warning("leaning hit a unusual case. This should not happen")
+        return count, self.cur_offsets[:count]
+
+
+class StackSequence(BookSequence):
+    """
+    Caches the sampled books of a stack and their offsets along the up axis.
+    """
+
+    def __init__(self, parameters):
+        super().__init__(parameters)
+        self.cur_offsets = np.zeros(0)
+        self.cur_heights = np.zeros(0)
+
+    def extend(self, count):
+        start = self.count
+        super().extend(count)
+        if self.count == start:
+            return
+
+        first = max(start - 1, 0)
+        width = self.widths[first:]
+        increments = width[1:] / 2 + width[:-1] / 2
+
+        if start == 0:
+            cur_offsets = np.cumsum(np.concatenate(([width[0] / 2], increments)))
+            previous_offsets = cur_offsets[:-1]
+        else:
+            cur_offsets = np.cumsum(np.concatenate(([self.cur_offsets[-1]], increments)))[1:]
+            previous_offsets = np.concatenate(([self.cur_offsets[-1]], cur_offsets[:-1]))
+
+        self.cur_offsets = np.concatenate((self.cur_offsets, cur_offsets))
+        self.cur_heights = np.concatenate((self.cur_heights, previous_offsets + width[1:]))
+
+    def fit(self, length):
+        """Finds how many books fit on a stack of the given height.
+        The first book is always added.
+
+        Args:
+            length (float): the height of the stack
+
+        Returns:
+            (int, numpy.ndarray): the number of books and the offset of each book along the up axis
+        """
+        if self.count == 0:
+            self.extend(estimate_book_count(length, self.parameters))
+
+        while True:
+            # cur_heights[i] is the height of the stack including book i + 1
+            stop = ~(self.cur_heights < length)
+            if stop.any():
+                break
+            self.log.debug("%d books do not fill the stack. Sampling more books.", self.count)
+            self.extend(2 * self.count)
+
+        count = int(np.argmax(stop)) + 1
+        return count, self.cur_offsets[:count]
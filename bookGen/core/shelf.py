@@ -0,0 +1,106 @@
+"""
+This file contains the layout of a shelf-like grouping of books. It does not depend on blender.
+"""
+
+import logging
+
+import numpy as np
+
+from .batch import BookBatch
+from .sequence import ShelfSequence
+from .transform import normalized, basis_matrix
+
+
+class ShelfLayout:
+    """
+    Computes the parameters and transforms of books in a shelf-like grouping.
+    """
+
+    log = logging.getLogger("bookGen.core.ShelfLayout")
+
+    def __init__(self, start, end, normal, parameters):
+        start = np.array(start, dtype=float)
+        end = np.array(end, dtype=float)
+
+        self.origin = start
+        self.direction = normalized(end - start)
+        self.rotation_matrix = basis_matrix(self.direction, np.array(normal, dtype=float))
+        self.width = float(np.linalg.norm(end - start))
+        self.parameters = parameters
+        self.batch = BookBatch.empty()
+        self.align_offset = 0
+
+    def place_books(self, books, offsets):
+        """Computes the location and rotation of books at the given offsets
+
+        Args:
+            books (Dict[str, numpy.ndarray]): the parameters of the books
+            offsets (numpy.ndarray): the offset of each book along the shelf
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): the locations (n, 3) and rotations (n, 3, 3) of the books
+        """
+        count = len(offsets)
+        lean_angle = books["lean_angle"][:count]
+        height = books["cover_height"][:count]
+        depth = books["cover_depth"][:count]
+        width = books["page_thickness"][:count] + 2 * books["cover_thickness"][:count]
+
+        locations = np.zeros((count, 3))
+
+        # book alignment
+        if not self.parameters["alignment"] == "2":
+            offset_dir = -1 if self.parameters["alignment"] == "1" else 1
+            self.align_offset = depth[0] / 2
+            locations[1:, 1] = offset_dir * (depth[1:] / 2 - self.align_offset)
+
+        # leaning
+        x = np.where(lean_angle < 0, width / 2, -width / 2)
+        z = height / 2
+        cos = np.cos(lean_angle)
+        sin = np.sin(lean_angle)
+        locations[:, 0] = cos * x + sin * z
+        locations[:, 2] = -sin * x + cos * z
+
+        # distribution
+        locations[:, 0] += offsets
+        locations = locations @ self.rotation_matrix.T + self.origin
+
+        lean_rotations = np.zeros((count, 3, 3))
+        lean_rotations[:, 0, 0] = cos
+        lean_rotations[:, 0, 2] = sin
+        lean_rotations[:, 1, 1] = 1
+        lean_rotations[:, 2, 0] = -sin
+        lean_rotations[:, 2, 2] = cos
+        rotations = self.rotation_matrix @ lean_rotations
+
+        return locations, rotations
+
+    def fill(self, sequence=None):
+        """Fills the shelf with books
+
+        Args:
+            sequence (ShelfSequence, optional): previously sampled books with the same parameters.
+                Passing the same sequence while the shelf is resized only samples the missing books.
+
+        Returns:
+            BookBatch: the books of the shelf
+        """
+        if sequence is None:
+            sequence = ShelfSequence(self.parameters)
+
+        fitting, offsets = sequence.fit(self.width)
+        books = sequence.get(fitting)
+
+        locations, rotations = self.place_books(books, offsets)
+
+        self.batch = BookBatch.from_books(books, locations, rotations)
+        return self.batch
+
+    def get_geometry(self):
+        """Returns the raw geometry of the shelf for previz
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): a tuple containing the vertices and the face indices
+        """
+        return self.batch.get_geometry()
@@ -0,0 +1,94 @@
+"""
+This file contains the layout of a stack of books. It does not depend on blender.
+"""
+
+import logging
+from math import radians
+
+import numpy as np
+
+from .batch import BookBatch
+from .sequence import StackSequence
+from .transform import rotation_matrix, basis_matrix
+
+
+class StackLayout:
+    """
+    Computes the parameters and transforms of books in a stack.
+    """
+
+    log = logging.getLogger("bookGen.core.StackLayout")
+
+    def __init__(self, origin, forward, up, height, parameters):
+        self.origin = np.array(origin, dtype=float)
+        self.forward = np.array(forward, dtype=float)
+        self.up = np.array(up, dtype=float)
+        self.height = height
+
+        self.rotation_matrix = basis_matrix(self.forward, self.up)
+        self.parameters = parameters
+        self.batch = BookBatch.empty()
+
+        self.align_offset = 0
+
+    def place_books(self, books, offsets):
+        """Computes the location and rotation of books at the given offsets
+
+        Args:
+            books (Dict[str, numpy.ndarray]): the parameters of the books
+            offsets (numpy.ndarray): the offset of each book along the up axis
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): the locations (n, 3) and rotations (n, 3, 3) of the books
+        """
+        count = len(offsets)
+        self.align_offset = books["cover_depth"][0] / 2
+
+        # distribution
+        locations = offsets[:, np.newaxis] * self.rotation_matrix[:, 2] + self.origin
+
+        z_rotation = radians(180) if (self.parameters["stack_top_face"] == "1") else 0
+        y_rotation = int(self.parameters["stack_top_face"]) * radians(-90)
+        base = rotation_matrix(z_rotation, "Z") @ self.rotation_matrix @ rotation_matrix(y_rotation, "Y")
+
+        z_rotation_rnd = np.radians(books["z_rotation"][:count])
+        cos = np.cos(z_rotation_rnd)
+        sin = np.sin(z_rotation_rnd)
+        rnd_rotations = np.zeros((count, 3, 3))
+        rnd_rotations[:, 0, 0] = cos
+        rnd_rotations[:, 0, 1] = -sin
+        rnd_rotations[:, 1, 0] = sin
+        rnd_rotations[:, 1, 1] = cos
+        rnd_rotations[:, 2, 2] = 1
+        rotations = rnd_rotations @ base
+
+        return locations, rotations
+
+    def fill(self, sequence=None):
+        """
+        Fills the stack with books
+
+        Args:
+            sequence (StackSequence, optional): previously sampled books with the same parameters.
+                Passing the same sequence while the stack is resized only samples the missing books.
+
+        Returns:
+            BookBatch: the books of the stack
+        """
+        if sequence is None:
+            sequence = StackSequence(self.parameters)
+
+        fitting, offsets = sequence.fit(self.height)
+        books = sequence.get(fitting)
+        locations, rotations = self.place_books(books, offsets)
+
+        self.batch = BookBatch.from_books(books, locations, rotations)
+        return self.batch
+
+    def get_geometry(self):
+        """Returns the raw geometry of the stack for previz
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): a tuple containing the vertices and the face indices
+        """
+        return self.batch.get_geometry()
@@ -0,0 +1,197 @@
+"""
+Contains the timing of the phases of a rebuild per grouping.
+
+The code of each phase is wrapped in "with measure(phase):". Timings are only recorded while the stats of a grouping
+are activated with "with record(stats):", otherwise measure does nothing. Nested phases are exclusive, e.g. the time
+spent sampling is not counted as fill time.
+"""
+
+import json
+import time
+
+PHASES = ("sampling", "fill", "to_object", "linking", "materials", "cleanup")
+
+# the grouping that is currently recorded and the stats of the last rebuild
+_current = None
+_last_rebuild = None
+
+
+class GroupingStats:
+    """
+    The time spent in every phase and the size of one grouping.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.books = 0
+        self.vertices = 0
+        self.objects = 0
+        self._stack = []
+        self._start = 0.0
+
+    @property
+    def total(self):
+        """float: the time spent in all phases in seconds"""
+        return sum(self.phases.values())
+
+    def start(self, phase):
+        """Starts timing a phase. A phase that is already running is paused until this one stops.
+
+        Args:
+            phase (str): one of PHASES
+        """
+        now = time.perf_counter()
+        if self._stack:
+            self.phases[self._stack[-1]] += now - self._start
+        self._stack.append(phase)
+        self._start = now
+
+    def stop(self):
+        """Stops timing the innermost phase and resumes the phase it was started in"""
+        now = time.perf_counter()
+        self.phases[self._stack.pop()] += now - self._start
+        self._start = now
+
+    def to_dict(self):
+        """Returns the stats as a json serializable dict
+
+        Returns:
+            Dict[str, any]: the stats
+        """
+        return {
+            "name": self.name,
+            "books": self.books,
+            "vertices": self.vertices,
+            "objects": self.objects,
+            "total": self.total,
+            "phases": dict(self.phases),
+        }
+
+
+class RebuildStats:
+    """
+    The stats of all groupings of one rebuild.
+    """
+
+    def __init__(self):
+        self.timestamp = time.time()
+        self.groupings = []
+
+    def add_grouping(self, name):
+        """Adds the stats of a grouping
+
+        Args:
+            name (str): the name of the grouping
+
+        Returns:
+            GroupingStats: the empty stats of the grouping
+        """
+        stats = GroupingStats(name)
+        self.groupings.append(stats)
+        return stats
+
+    def to_dict(self):
+        """Returns the stats as a json serializable dict
+
+        Returns:
+            Dict[str, any]: the stats
+        """
+        return {
+            "timestamp": self.timestamp,
+            "books": sum(stats.books for stats in self.groupings),
+            "vertices": sum(stats.vertices for stats in self.groupings),
+            "objects": sum(stats.objects for stats in self.groupings),
+            "total": sum(stats.total for stats in self.groupings),
+            "groupings": [stats.to_dict() for stats in self.groupings],
+        }
+
+    def write_json(self, filepath):
+        """Writes the stats to a json file
+
+        Args:
+            filepath (str): the path of the file
+        """
+        with open(filepath, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+def start_rebuild():
+    """Starts collecting the stats of a new rebuild
+
+    Returns:
+        RebuildStats: the stats of the new rebuild
+    """
+    global _last_rebuild
+    _last_rebuild = RebuildStats()
+    return _last_rebuild
+
+
+def get_last_rebuild():
+    """Returns the stats of the last rebuild
+
+    Returns:
+        RebuildStats: the stats or None if nothing was rebuilt yet
+    """
+    return _last_rebuild
+
+
+class _Record:
+    """Context manager that makes a grouping the one that is currently recorded"""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.previous = None
+
+    def __enter__(self):
+        global _current
+        self.previous = _current
+        _current = self.stats
+        return self.stats
+
+    def __exit__(self, *_args):
+        global _current
+        _current = self.previous
+
+
+class _Measure:
+    """Context manager that times a phase of the grouping that is currently recorded"""
+
+    __slots__ = ("phase", "stats")
+
+    def __init__(self, phase):
+        self.phase = phase
+        self.stats = None
+
+    def __enter__(self):
+        self.stats = _current
+        if self.stats is not None:
+            self.stats.start(self.phase)
+
+    def __exit__(self, *_args):
+        if self.stats is not None:
+            self.stats.stop()
+
+
+def record(stats):
+    """Records all measured phases into the stats of a grouping while the context is active
+
+    Args:
+        stats (GroupingStats): the stats of the grouping
+
+    Returns:
+        _Record: the context manager
+    """
+    return _Record(stats)
+
+
+def measure(phase):
+    """Measures the time spent in a phase of the grouping that is currently recorded
+
+    Args:
+        phase (str): one of PHASES
+
+    Returns:
+        _Measure: the context manager
+    """
+    return _Measure(phase)
@@ -0,0 +1,74 @@
+"""
+Contains a counter-based random number generator for the books of a grouping.
+
+Every random number is a hash of the seed, the grouping id, the book index and the draw index.
+This allows to sample any book without replaying the books before it and does not touch
+the global random state used by other add-ons.
+"""
+
+import numpy as np
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_GROUPING_SALT = np.uint64(0xD1B54A32D192ED03)
+_VARIANT_SALT = np.uint64(0x8CB92BA72F3D8DD7)
+
+
+def _mix(x):
+    """The SplitMix64 finalizer. Scrambles uint64 values into uniformly distributed uint64 values.
+
+    Args:
+        x (numpy.ndarray): uint64 values
+
+    Returns:
+        numpy.ndarray: the scrambled uint64 values
+    """
+    # uint64 arithmetic is meant to wrap around
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * _MIX_1
+        x = (x ^ (x >> np.uint64(27))) * _MIX_2
+        return x ^ (x >> np.uint64(31))
+
+
+def _to_uint64(value):
+    """Maps a python integer to a uint64 array, negative values wrap around
+
+    Args:
+        value (int): the integer
+
+    Returns:
+        numpy.ndarray: the value as a zero dimensional uint64 array
+    """
+    return np.array(int(value) % 2**64, dtype=np.uint64)
+
+
+class BookStreams:
+    """
+    Provides independent streams of uniform random numbers for every book of a grouping.
+    """
+
+    def __init__(self, seed, grouping_id=0):
+        self.seed = seed
+        self.grouping_id = grouping_id
+        with np.errstate(over="ignore"):
+            self.key = _mix(_mix(_to_uint64(seed)) ^ (_to_uint64(grouping_id) * _GROUPING_SALT))
+
+    def uniforms(self, indices, draws, variants=0):
+        """Returns uniform random numbers in [0, 1) for the given books
+
+        Args:
+            indices (numpy.ndarray): the indices of the books
+            draws (int): the number of random numbers per book
+            variants (int or numpy.ndarray): changing the variant of a book re-rolls only that book
+
+        Returns:
+            numpy.ndarray: random numbers of shape (len(indices), draws)
+        """
+        with np.errstate(over="ignore"):
+            indices = np.asarray(indices).astype(np.uint64)
+            variants = np.broadcast_to(np.asarray(variants), indices.shape).astype(np.uint64)
+            book_keys = _mix(self.key ^ _mix(indices + np.uint64(1)) ^ (variants * _VARIANT_SALT))
+            counters = np.arange(1, draws + 1, dtype=np.uint64) * _GOLDEN_GAMMA
+            bits = _mix(book_keys[:, np.newaxis] + counters[np.newaxis, :])
+        return (bits >> np.uint64(11)) * (1.0 / 2**53)
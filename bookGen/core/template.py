@@ -0,0 +1,74 @@
+"""
+Contains the vertex template of a book as a linear basis.
+
+Every vertex coordinate of a book is a linear combination of the shape parameters and the two
+offsets of the curled spine. The vertices of many books are therefore a single matrix product
+of their features with the basis.
+"""
+
+import numpy as np
+
+from ..data.vertices import get_linear_vertices
+
+# The columns of BookBatch.parameters. The order matches the arguments of get_vertices and get_uvs.
+GEOMETRY_PARAMETERS = (
+    "page_thickness",
+    "page_height",
+    "cover_depth",
+    "cover_height",
+    "cover_thickness",
+    "page_depth",
+    "hinge_inset",
+    "hinge_width",
+    "spine_curl",
+)
+VERTEX_FEATURES = GEOMETRY_PARAMETERS + ("spine_offset_side", "spine_offset_center")
+VERTEX_COUNT = 44
+
+
+def _build_vertex_basis():
+    """Evaluates the vertex template for every feature separately
+
+    Returns:
+        numpy.ndarray: the basis (features, VERTEX_COUNT * 3)
+    """
+    identity = np.identity(len(VERTEX_FEATURES))
+    return np.array([get_linear_vertices(*row) for row in identity.tolist()], dtype=np.float64).reshape(
+        len(VERTEX_FEATURES), -1
+    )
+
+
+VERTEX_BASIS = _build_vertex_basis()
+
+
+def get_vertex_features(parameters):
+    """Appends the nonlinear spine offsets to the shape parameters of many books
+
+    Args:
+        parameters (numpy.ndarray): the shape parameters (n, 9) in the order of GEOMETRY_PARAMETERS
+
+    Returns:
+        numpy.ndarray: the features (n, 11) in the order of VERTEX_FEATURES
+    """
+    parameters = np.asarray(parameters, dtype=np.float64)
+    cover_thickness = parameters[:, GEOMETRY_PARAMETERS.index("cover_thickness")]
+    spine_curl = parameters[:, GEOMETRY_PARAMETERS.index("spine_curl")]
+
+    spine_angle = np.arctan(spine_curl / cover_thickness)
+    spine_offset_side = np.tan(spine_angle / 2) * cover_thickness
+    spine_offset_center = cover_thickness * np.cos(spine_angle)
+
+    return np.column_stack((parameters, spine_offset_side, spine_offset_center))
+
+
+def compute_vertices(parameters):
+    """Computes the object-space vertices of many books with a single matrix product
+
+    Args:
+        parameters (numpy.ndarray): the shape parameters (n, 9) in the order of GEOMETRY_PARAMETERS
+
+    Returns:
+        numpy.ndarray: the vertices (n, VERTEX_COUNT, 3)
+    """
+    vertices = get_vertex_features(parameters) @ VERTEX_BASIS
+    return vertices.astype(np.float32).reshape(-1, VERTEX_COUNT, 3)
@@ -0,0 +1,52 @@
+"""
+Contains the topology of a book as int32 arrays. It is the same for every book and is computed once on import.
+All mesh and preview builders share these tables.
+"""
+
+import numpy as np
+
+from ..data.faces import get_faces
+from ..data.creases import get_creases
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+# the vertex indices of each face (faces, 4)
+FACES = _read_only(np.asarray(get_faces(), dtype=np.int32))
+FACE_COUNT = len(FACES)
+
+# the vertex index of each loop and the number of loops of each face
+LOOP_VERTICES = _read_only(FACES.reshape(-1).copy())
+LOOP_TOTALS = _read_only(np.full(FACE_COUNT, FACES.shape[1], dtype=np.int32))
+LOOP_STARTS = _read_only((np.cumsum(LOOP_TOTALS) - LOOP_TOTALS).astype(np.int32))
+LOOP_COUNT = len(LOOP_VERTICES)
+
+
+def _get_edges():
+    """Derives the edges of a book from its faces
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): the sorted vertex indices of each edge and the edge index of each loop
+    """
+    loop_keys = np.sort(np.stack((FACES, np.roll(FACES, -1, axis=1)), axis=-1).reshape(-1, 2), axis=1)
+    edge_keys, loop_edges = np.unique(loop_keys, axis=0, return_inverse=True)
+    return edge_keys.astype(np.int32), loop_edges.reshape(-1).astype(np.int32)
+
+
+_edge_keys, _loop_edges = _get_edges()
+
+# the vertex indices of each edge (edges, 2) and the edge index of each loop
+EDGE_KEYS = _read_only(_edge_keys)
+LOOP_EDGES = _read_only(_loop_edges)
+
+# the creased edges (creases, 2) and the crease weight of each edge in EDGE_KEYS
+CREASE_EDGES = _read_only(np.sort(np.asarray(get_creases(), dtype=np.int32), axis=1))
+CREASE_WEIGHTS = _read_only(
+    (EDGE_KEYS[:, np.newaxis, :] == CREASE_EDGES[np.newaxis, :, :]).all(axis=2).any(axis=1).astype(np.float32)
+)
+
+# the faces of the text block that use the page material
+PAGE_FACE_MASK = _read_only(np.isin(np.arange(FACE_COUNT), (0, 1, 2, 3)))
@@ -0,0 +1,86 @@
+"""
+Contains helpers to describe transforms without depending on mathutils.
+"""
+
+from math import cos, sin
+
+import numpy as np
+
+
+def rotation_matrix(angle, axis):
+    """Returns a 3x3 rotation matrix around one of the coordinate axes.
+    This matches mathutils.Matrix.Rotation(angle, 3, axis).
+
+    Args:
+        angle (float): the rotation angle in radians
+        axis (str): the axis to rotate around. One of "X", "Y" or "Z"
+
+    Returns:
+        numpy.ndarray: the 3x3 rotation matrix
+    """
+    c = cos(angle)
+    s = sin(angle)
+    if axis == "X":
+        return np.array([[1.0, 0.0, 0.0], [0.0, c, -s], [0.0, s, c]])
+    if axis == "Y":
+        return np.array([[c, 0.0, s], [0.0, 1.0, 0.0], [-s, 0.0, c]])
+    if axis == "Z":
+        return np.array([[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]])
+    raise ValueError("unknown rotation axis %r" % axis)
+
+
+def normalized(vector):
+    """Returns the vector scaled to unit length
+
+    Args:
+        vector (numpy.ndarray): the vector to normalize
+
+    Returns:
+        numpy.ndarray: the normalized vector
+    """
+    length = np.linalg.norm(vector)
+    if length == 0:
+        return np.zeros_like(vector)
+    return vector / length
+
+
+def basis_matrix(forward, up):
+    """Returns the rotation of a grouping with the given forward and up direction.
+    The columns of the matrix are forward, side and up.
+
+    Args:
+        forward (numpy.ndarray): the forward direction of the grouping
+        up (numpy.ndarray): the up direction of the grouping
+
+    Returns:
+        numpy.ndarray: the 3x3 rotation matrix
+    """
+    return np.column_stack([forward, -np.cross(forward, up), up])
+
+
+def decompose_matrices(matrices):
+    """Splits matrices into XYZ euler rotations and the scale along each axis.
+    Shear is not representable and is dropped.
+
+    Args:
+        matrices (numpy.ndarray): the 3x3 matrices (n, 3, 3)
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): the euler angles (n, 3) and the scales (n, 3)
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 3, 3)
+    scales = np.linalg.norm(matrices, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rotations = np.nan_to_num(matrices / scales[:, np.newaxis, :])
+
+    # the XYZ euler rotation is Rz @ Ry @ Rx
+    cos_y = np.hypot(rotations[:, 0, 0], rotations[:, 1, 0])
+    gimbal_lock = cos_y < 1e-6
+    x = np.where(
+        gimbal_lock,
+        np.arctan2(-rotations[:, 1, 2], rotations[:, 1, 1]),
+        np.arctan2(rotations[:, 2, 1], rotations[:, 2, 2]),
+    )
+    y = np.arctan2(-rotations[:, 2, 0], cos_y)
+    z = np.where(gimbal_lock, 0.0, np.arctan2(rotations[:, 1, 0], rotations[:, 0, 0]))
+    return np.column_stack((x, y, z)), scales
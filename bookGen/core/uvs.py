@@ -0,0 +1,138 @@
+"""
+Contains the vectorized uv layout of books.
+
+For a fixed scale factor the uvs of a book are linear in its dimensions, so the uvs of many books
+are a single matrix product like the vertices. Books with (nearly) identical dimensions share
+their uv layout through a cache.
+"""
+
+import logging
+
+import numpy as np
+
+from ..data.uvs import get_scaled_uvs
+from .template import GEOMETRY_PARAMETERS
+from .topology import LOOP_COUNT
+
+log = logging.getLogger("bookGen.core.uvs")
+
+UV_MARGIN = 0.02
+
+
+def _build_uv_basis(margin):
+    """Evaluates the uv layout for every dimension separately
+
+    Args:
+        margin (float): the margin between the uv islands
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): the basis (9, LOOP_COUNT * 2) and the constant offset (LOOP_COUNT * 2)
+    """
+
+    def flat_uvs(parameters):
+        return np.array(get_scaled_uvs(*parameters, 1.0, margin), dtype=np.float64).reshape(-1)
+
+    constant = flat_uvs([0.0] * len(GEOMETRY_PARAMETERS))
+    basis = np.array([flat_uvs(row) - constant for row in np.identity(len(GEOMETRY_PARAMETERS)).tolist()])
+    return basis, constant
+
+
+UV_BASIS, UV_CONSTANT = _build_uv_basis(UV_MARGIN)
+
+
+def get_uv_scales(parameters, margin=UV_MARGIN):
+    """Returns the factors that scale the uv islands of many books to fit the uv layout
+
+    Args:
+        parameters (numpy.ndarray): the shape parameters (n, 9) in the order of GEOMETRY_PARAMETERS
+        margin (float, optional): the margin between the uv islands. Defaults to UV_MARGIN.
+
+    Returns:
+        numpy.ndarray: the scale factor of each book
+    """
+    p = {name: parameters[:, i] for i, name in enumerate(GEOMETRY_PARAMETERS)}
+    x = np.maximum(p["cover_thickness"] * 2 + 2 * p["cover_height"], p["page_height"] + p["page_depth"])
+    y = (
+        p["page_thickness"] * 2
+        + p["cover_thickness"] * 2
+        + 2 * p["hinge_width"]
+        + p["page_thickness"]
+        + 2 * p["cover_depth"]
+    )
+    return np.where(x > y, (1 - 3 * margin) / x, (1 - 4 * margin) / y)
+
+
+def compute_uvs(parameters):
+    """Computes the uvs of many books with a single matrix product
+
+    Args:
+        parameters (numpy.ndarray): the shape parameters (n, 9) in the order of GEOMETRY_PARAMETERS
+
+    Returns:
+        numpy.ndarray: the uvs (n, LOOP_COUNT, 2) in the order of the face loops
+    """
+    parameters = np.asarray(parameters, dtype=np.float64).reshape(-1, len(GEOMETRY_PARAMETERS))
+    scaled = parameters * get_uv_scales(parameters)[:, np.newaxis]
+    uvs = scaled @ UV_BASIS + UV_CONSTANT
+    return uvs.astype(np.float32).reshape(-1, LOOP_COUNT, 2)
+
+
+class UVCache:
+    """
+    Caches the uv layouts of books by their quantized dimensions.
+    All books whose dimensions round to the same values share the uv layout of the rounded dimensions.
+    """
+
+    def __init__(self, quantum=1e-5, max_size=65536):
+        """
+        Args:
+            quantum (float, optional): the step the dimensions are rounded to. Defaults to 0.01 mm.
+            max_size (int, optional): the number of layouts after which the cache is cleared.
+        """
+        self.quantum = quantum
+        self.max_size = max_size
+        self.layouts = {}
+
+    def clear(self):
+        """Removes all cached layouts"""
+        self.layouts = {}
+
+    def get_uvs(self, parameters):
+        """Returns the uvs of many books. Only layouts that are not cached yet are computed.
+
+        Args:
+            parameters (numpy.ndarray): the shape parameters (n, 9) in the order of GEOMETRY_PARAMETERS
+
+        Returns:
+            numpy.ndarray: the uvs (n, LOOP_COUNT, 2) in the order of the face loops
+        """
+        parameters = np.asarray(parameters, dtype=np.float64).reshape(-1, len(GEOMETRY_PARAMETERS))
+        if len(parameters) == 0:
+            return np.zeros((0, LOOP_COUNT, 2), dtype=np.float32)
+
+        keys = np.round(parameters / self.quantum).astype(np.int64)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        layouts = np.empty((len(unique_keys), LOOP_COUNT, 2), dtype=np.float32)
+        missing = []
+        for i, key in enumerate(unique_keys):
+            layout = self.layouts.get(key.tobytes())
+            if layout is None:
+                missing.append(i)
+            else:
+                layouts[i] = layout
+
+        if missing:
+            if len(self.layouts) + len(missing) > self.max_size:
+                self.clear()
+            computed = compute_uvs(unique_keys[missing] * self.quantum)
+            layouts[missing] = computed
+            for i, layout in zip(missing, computed):
+                self.layouts[unique_keys[i].tobytes()] = layout
+
+        log.debug("uv layouts: %d books, %d unique, %d computed", len(parameters), len(unique_keys), len(missing))
+        return layouts[inverse]
+
+
+uv_cache = UVCache()
@@ -3,6 +3,36 @@ Contains the parameterized uvs of a single book.
 """
 
 
+def get_uv_scale(
+    page_thickness,
+    page_height,
+    cover_depth,
+    cover_height,
+    cover_thickness,
+    page_depth,
+    hinge_inset,
+    hinge_width,
+    spine_curl,
+    margin=0.02,
+):
+    """
+    Returns the factor that scales the uv islands of a single book to fit the uv layout.
+    This is the only nonlinear term of the uvs.
+    """
+    # compute effective size of all islands combined without margin
+    x = max(cover_thickness * 2 + 2 * cover_height, page_height + page_depth)
+    y = page_thickness * 2 + cover_thickness * 2 + 2 * hinge_width + page_thickness + 2 * cover_depth
+
+    if x > y:
+        longest_side = x
+        margins = 3 * margin
+    else:
+        longest_side = y
+        margins = 4 * margin
+
+    return (1 - margins) / longest_side
+
+
 def get_uvs(
     page_thickness,
     page_height,
@@ -18,6 +48,50 @@ def get_uvs(
     """
     Returns the parameterized uvs of a single book.
     """
+    scale_factor = get_uv_scale(
+        page_thickness,
+        page_height,
+        cover_depth,
+        cover_height,
+        cover_thickness,
+        page_depth,
+        hinge_inset,
+        hinge_width,
+        spine_curl,
+        margin,
+    )
+    return get_scaled_uvs(
+        page_thickness,
+        page_height,
+        cover_depth,
+        cover_height,
+        cover_thickness,
+        page_depth,
+        hinge_inset,
+        hinge_width,
+        spine_curl,
+        scale_factor,
+        margin,
+    )
+
+
+def get_scaled_uvs(
+    page_thickness,
+    page_height,
+    cover_depth,
+    cover_height,
+    cover_thickness,
+    page_depth,
+    hinge_inset,
+    hinge_width,
+    spine_curl,
+    scale_factor,
+    margin=0.02,
+):
+    """
+    Returns the uvs of a single book for the given scale factor.
+    For a fixed margin the uvs are linear in the dimensions multiplied with the scale factor.
+    """
     # generate all islands starting at left bottom corner (0,0)
     top_face = 0
     top = [[0, 0], [page_height, 0], [page_height, page_thickness], [0, page_thickness]]
@@ -264,18 +338,6 @@ def get_uvs(
 
     islands = [top, bottom, left, right, exterior, interior]
 
-    # compute effective size of all islands combined without margin
-    x = max(cover_thickness * 2 + 2 * cover_height, page_height + page_depth)
-    y = page_thickness * 2 + cover_thickness * 2 + 2 * hinge_width + page_thickness + 2 * cover_depth
-
-    if x > y:
-        longest_side = x
-        margins = 3 * margin
-    else:
-        longest_side = y
-        margins = 4 * margin
-
-    scale_factor = (1 - margins) / longest_side
     # scale islands to fit layout
 
     for v in range(len(top)):
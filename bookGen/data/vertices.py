@@ -5,6 +5,16 @@ Contains the parameterized vertices of a single book.
 from math import atan, cos, tan
 
 
+def get_spine_offsets(cover_thickness, spine_curl):
+    """
+    Returns the offsets of the curled spine. These are the only nonlinear terms of the vertices.
+    """
+    spine_angle = atan(spine_curl / cover_thickness)
+    spine_offset_side = tan(spine_angle / 2) * cover_thickness
+    spine_offset_center = cover_thickness * cos(spine_angle)
+    return spine_offset_side, spine_offset_center
+
+
 def get_vertices(
     page_thickness,
     page_height,
@@ -19,10 +29,39 @@ def get_vertices(
     """
     Returns the vertices given the dimensions
     """
-    spine_angle = atan(spine_curl / cover_thickness)
-    spine_offset_center = cover_thickness * cos(spine_angle)
-    spine_offset_side = tan(spine_angle / 2) * cover_thickness
+    spine_offset_side, spine_offset_center = get_spine_offsets(cover_thickness, spine_curl)
+
+    return get_linear_vertices(
+        page_thickness,
+        page_height,
+        cover_depth,
+        cover_height,
+        cover_thickness,
+        page_depth,
+        hinge_inset,
+        hinge_width,
+        spine_curl,
+        spine_offset_side,
+        spine_offset_center,
+    )
+
 
+def get_linear_vertices(
+    page_thickness,
+    page_height,
+    cover_depth,
+    cover_height,
+    cover_thickness,
+    page_depth,
+    hinge_inset,
+    hinge_width,
+    spine_curl,
+    spine_offset_side,
+    spine_offset_center,
+):
+    """
+    Returns the vertices given the dimensions and the spine offsets. Every coordinate is linear in the arguments.
+    """
     return [
         # textblock
         [-page_thickness / 2, page_depth / 2, -page_height / 2],
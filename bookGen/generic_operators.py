@@ -6,19 +6,23 @@ import time
 import logging
 
 import bpy
-from bpy.props import EnumProperty, StringProperty, BoolProperty
+from bpy.props import EnumProperty, StringProperty, BoolProperty, FloatProperty, IntProperty
+from bpy_extras.io_utils import ExportHelper
 
 from .utils import (
-    get_shelf_parameters,
-    get_stack_parameters,
     get_bookgen_collection,
+    get_grouping_hash,
     get_active_grouping,
     get_active_settings,
-    get_settings_by_name,
+    get_groupings_by_settings,
+    remove_grouping_books,
+    rename_grouping,
     visible_objects_and_duplis,
 )
-from .shelf import Shelf
-from .stack import Stack
+from .core.stats import get_last_rebuild, record, start_rebuild
+from .grouping import create_grouping
+from .profiling import profiled
+from .registry import invalidate_registry
 
 
 class BOOKGEN_OT_Rebuild(bpy.types.Operator):
@@ -35,6 +39,16 @@ class BOOKGEN_OT_Rebuild(bpy.types.Operator):
 
     log = logging.getLogger("bookGen.operator")
     clear: BoolProperty(name="clear", description="Remove all books", default=False)
+    in_place: BoolProperty(
+        name="in place",
+        description="Reuse the existing book objects and meshes instead of recreating them",
+        default=True,
+    )
+    dirty_only: BoolProperty(
+        name="dirty only",
+        description="Only rebuild groupings whose parameters or placement changed since they were last built",
+        default=False,
+    )
 
     def invoke(self, context, _event):
         """Rebuild called from the UI
@@ -73,56 +87,285 @@ class BOOKGEN_OT_Rebuild(bpy.types.Operator):
         """
         return context.mode == "OBJECT"
 
+    @profiled("rebuild")
     def run(self, context):
         """
         Collect new parameters, remove existing books,
         generate new books based on the parameters and add them to the  scene.
         """
         if self.clear:
-            for grouping_collection in get_bookgen_collection(context).children:
-                for obj in grouping_collection.objects:
-                    grouping_collection.objects.unlink(obj)
-                    bpy.data.meshes.remove(obj.data)
+            time_start = time.time()
+            removed = remove_grouping_books(*get_bookgen_collection(context).children)
+            self.report({"INFO"}, "Removed %d datablocks in %.2f secs" % (removed, time.time() - time_start))
             return
 
         time_start = time.time()
+        rebuilt = 0
+        rebuild_stats = start_rebuild()
 
         for grouping_collection in get_bookgen_collection(context).children:
             grouping_props = grouping_collection.BookGenGroupingProperties
-            settings = get_settings_by_name(context, grouping_props.settings_name)
-            if not settings:
+            grouping, parameters = create_grouping(context, grouping_collection)
+            if grouping is None:
                 continue
 
-            if grouping_props.grouping_type == "SHELF":
-                parameters = get_shelf_parameters(context, grouping_props.id, settings)
+            content_hash = get_grouping_hash(grouping_props, parameters)
+            if self.dirty_only and content_hash == grouping_props.content_hash:
+                continue
 
-                shelf = Shelf(
-                    grouping_collection.name,
-                    grouping_props.start,
-                    grouping_props.end,
-                    grouping_props.normal,
-                    parameters,
-                )
-                shelf.clean(context)
-                shelf.fill()
-
-                shelf.to_collection(context, with_uvs=True)
-            else:
-                parameters = get_stack_parameters(context, grouping_props.id, settings)
-                stack = Stack(
-                    grouping_collection.name,
-                    grouping_props.origin,
-                    grouping_props.forward,
-                    grouping_props.normal,
-                    grouping_props.height,
-                    parameters,
+            # a failing grouping stays dirty, the others are still rebuilt
+            grouping_stats = rebuild_stats.add_grouping(grouping_collection.name)
+            try:
+                with record(grouping_stats):
+                    grouping.fill()
+                    if self.in_place:
+                        grouping.update_collection(context, with_uvs=True)
+                    else:
+                        grouping.to_collection(context, with_uvs=True)
+                grouping.count(grouping_stats)
+                grouping_props.content_hash = content_hash
+                rebuilt += 1
+            except Exception:
+                self.log.exception("Failed to rebuild %s", grouping_collection.name)
+                self.report({"ERROR"}, "Failed to rebuild %s" % grouping_collection.name)
+
+        self.log.info("Finished populating %d groupings in %.4f secs", rebuilt, (time.time() - time_start))
+
+
+class BOOKGEN_OT_RebuildAsync(bpy.types.Operator):
+    """Regenerate all books in the background"""
+
+    bl_idname = "bookgen.rebuild_async"
+    bl_label = "Regenerate all in background"
+    bl_description = (
+        "Regenerate all books in small steps while the interface stays responsive.\n\n"
+        "Press Esc to cancel. Groupings that are already finished are kept"
+    )
+    bl_options = {"REGISTER", "UNDO"}
+
+    log = logging.getLogger("bookGen.operator")
+    dirty_only: BoolProperty(
+        name="dirty only",
+        description="Only rebuild groupings whose parameters or placement changed since they were last built",
+        default=False,
+    )
+    time_budget: FloatProperty(
+        name="time budget",
+        description="Time spent rebuilding per step in seconds",
+        default=0.05,
+        min=0.005,
+    )
+    chunk_size: IntProperty(
+        name="chunk size",
+        description="Number of books created at once",
+        default=50,
+        min=1,
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.jobs = []
+        self.job_index = 0
+        self.steps = None
+        self.timer = None
+        self.time_start = 0
+
+    @classmethod
+    def poll(cls, context):
+        """Check if we are in object mode before calling the operator
+
+        Args:
+            context (bpy.types.Context): the execution context for the operator
+
+        Returns:
+            bool: True if the operator can be executed, otherwise false.
+        """
+        return context.mode == "OBJECT"
+
+    def invoke(self, context, _event):
+        """Start the rebuild from the UI
+
+        Args:
+            context (bpy.types.Context): the execution context for the operator
+            _event (bpy.type.Event): the invocation event
+
+        Returns:
+            Set[str]: operator return code
+        """
+        self.collect_jobs(context)
+        if not self.jobs:
+            return {"FINISHED"}
+
+        window_manager = context.window_manager
+        self.timer = window_manager.event_timer_add(0.01, window=context.window)
+        window_manager.modal_handler_add(self)
+        window_manager.progress_begin(0, len(self.jobs))
+        self.update_status(context)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        """Rebuild called from a script. The steps are run at once because there is no event loop to yield to.
+
+        Args:
+            context (bpy.types.Context): the execution context for the operator
+
+        Returns:
+            Set[str]: operator return code
+        """
+        self.collect_jobs(context)
+        while self.step(context):
+            pass
+        self.log.info("Finished populating %d groupings in %.4f secs", len(self.jobs), time.time() - self.time_start)
+        return {"FINISHED"}
+
+    def collect_jobs(self, context):
+        """Collects the groupings that need to be rebuilt
+
+        Args:
+            context (bpy.types.Context): the execution context for the operator
+        """
+        self.time_start = time.time()
+        self.jobs = []
+        self.job_index = 0
+        self.steps = None
+        rebuild_stats = start_rebuild()
+        for grouping_collection in get_bookgen_collection(context).children:
+            grouping, parameters = create_grouping(context, grouping_collection)
+            if grouping is None:
+                continue
+            content_hash = get_grouping_hash(grouping_collection.BookGenGroupingProperties, parameters)
+            if self.dirty_only and content_hash == grouping_collection.BookGenGroupingProperties.content_hash:
+                continue
+            grouping_stats = rebuild_stats.add_grouping(grouping_collection.name)
+            self.jobs.append((grouping_collection, grouping, content_hash, grouping_stats))
+
+    def modal(self, context, event):
+        """Rebuild for the time budget on every timer event and pass all other events on to the viewport
+
+        Args:
+            context (bpy.types.Context): the execution context of the operator
+            event (bpy.types.Event): the modal event
+
+        Returns:
+            Set(str): the operator return code
+        """
+        if event.type == "ESC" and event.value == "PRESS":
+            if self.steps is not None:
+                # discards the staging collection of the unfinished grouping
+                self.steps.close()
+                self.steps = None
+            self.finish(context)
+            self.report({"INFO"}, "Rebuild cancelled after %d of %d groupings" % (self.job_index, len(self.jobs)))
+            return {"FINISHED"}
+
+        if event.type != "TIMER" or event.timer != self.timer:
+            return {"PASS_THROUGH"}
+
+        deadline = time.perf_counter() + self.time_budget
+        while time.perf_counter() < deadline:
+            if not self.step(context):
+                self.finish(context)
+                self.log.info(
+                    "Finished populating %d groupings in %.4f secs", len(self.jobs), time.time() - self.time_start
                 )
-                stack.clean(context)
-                stack.fill()
+                return {"FINISHED"}
+
+        self.update_status(context)
+        return {"RUNNING_MODAL"}
 
-                stack.to_collection(context, with_uvs=True)
+    def step(self, context):
+        """Runs the next step of the rebuild. Filling a grouping and every chunk of books is a separate step.
 
-        self.log.info("Finished populating shelf in %.4f secs", (time.time() - time_start))
+        Args:
+            context (bpy.types.Context): the execution context of the operator
+
+        Returns:
+            bool: False if all groupings are finished, otherwise True
+        """
+        if self.job_index >= len(self.jobs):
+            return False
+
+        grouping_collection, grouping, content_hash, grouping_stats = self.jobs[self.job_index]
+        try:
+            with record(grouping_stats):
+                if self.steps is None:
+                    grouping.fill()
+                    self.steps = grouping.to_collection_steps(context, with_uvs=True, chunk_size=self.chunk_size)
+                    return True
+                next(self.steps)
+            return True
+        except StopIteration:
+            grouping.count(grouping_stats)
+            grouping_collection.BookGenGroupingProperties.content_hash = content_hash
+        except Exception:
+            self.log.exception("Failed to rebuild %s", grouping_collection.name)
+            self.report({"ERROR"}, "Failed to rebuild %s" % grouping_collection.name)
+
+        self.steps = None
+        self.job_index += 1
+        return True
+
+    def update_status(self, context):
+        """Shows the progress in the status bar and at the cursor
+
+        Args:
+            context (bpy.types.Context): the execution context of the operator
+        """
+        context.window_manager.progress_update(self.job_index)
+        current = min(self.job_index + 1, len(self.jobs))
+        status = "Rebuilding grouping %d of %d. Press Esc to cancel" % (current, len(self.jobs))
+        context.workspace.status_text_set(status)
+
+    def finish(self, context):
+        """Removes the timer and resets the progress
+
+        Args:
+            context (bpy.types.Context): the execution context of the operator
+        """
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self.timer)
+        window_manager.progress_end()
+        context.workspace.status_text_set(None)
+
+
+class BOOKGEN_OT_ExportStats(bpy.types.Operator, ExportHelper):
+    """Export the timings of the last rebuild"""
+
+    bl_idname = "bookgen.export_stats"
+    bl_label = "Export timings"
+    bl_description = "Export the time spent in each phase of the last rebuild as JSON"
+    bl_options = {"REGISTER"}
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={"HIDDEN"})
+
+    @classmethod
+    def poll(cls, _context):
+        """Check if there are timings to export
+
+        Args:
+            _context (bpy.types.Context): the execution context for the operator
+
+        Returns:
+            bool: True if the operator can be executed, otherwise false.
+        """
+        return get_last_rebuild() is not None
+
+    def execute(self, _context):
+        """Writes the timings to the selected file
+
+        Args:
+            _context (bpy.types.Context): the execution context for the operator
+
+        Returns:
+            Set[str]: operator return code
+        """
+        try:
+            get_last_rebuild().write_json(self.filepath)
+        except OSError as error:
+            self.report({"ERROR"}, "Failed to export timings: %s" % error)
+            return {"CANCELLED"}
+        return {"FINISHED"}
 
 
 class BOOKGEN_OT_CreateSettings(bpy.types.Operator):
@@ -184,6 +427,7 @@ class BOOKGEN_OT_CreateSettings(bpy.types.Operator):
         active_grouping = get_active_grouping(context)
         if active_grouping:
             active_grouping.BookGenGroupingProperties.settings_name = self.name
+        invalidate_registry(context.scene)
         context.area.tag_redraw()
 
 
@@ -231,6 +475,7 @@ class BOOKGEN_OT_SetSettings(bpy.types.Operator):
         """
         active_grouping = get_active_grouping(context)
         active_grouping.BookGenGroupingProperties.settings_name = self.enum
+        invalidate_registry(context.scene)
         bpy.ops.bookgen.rebuild()
 
         return {"FINISHED"}
@@ -277,9 +522,9 @@ class BOOKGEN_OT_RemoveSettings(bpy.types.Operator):
 
         context.scene.BookGenSettings.remove(settings_id)
 
-        for collection in get_bookgen_collection(context).children:
-            if collection.BookGenGroupingProperties.settings_name == settings_name:
-                collection.BookGenGroupingProperties.settings_name = ""
+        for collection in get_groupings_by_settings(context, settings_name):
+            collection.BookGenGroupingProperties.settings_name = ""
+        invalidate_registry(context.scene)
 
         # bpy.ops.bookgen.rebuild()
         return {"FINISHED"}
@@ -366,11 +611,11 @@ class BOOKGEN_OT_RemoveGrouping(bpy.types.Operator):
             return
         collection = parent.children[active]
 
-        for obj in collection.objects:
-            collection.objects.unlink(obj)
-            bpy.data.meshes.remove(obj.data)
-        parent.children.unlink(collection)
+        time_start = time.time()
+        removed = remove_grouping_books(collection)
         bpy.data.collections.remove(collection)
+        invalidate_registry(context.scene)
+        self.report({"INFO"}, "Removed %d datablocks in %.2f secs" % (removed + 1, time.time() - time_start))
 
         context.scene.BookGenAddonProperties.active_shelf -= 1
 
@@ -448,7 +693,8 @@ class BOOKGEN_OT_UnlinkGrouping(bpy.types.Operator):
         parent = get_bookgen_collection(context)
         parent.children.unlink(active_grouping)
         context.scene.collection.children.link(active_grouping)
-        active_grouping.name = "unlinked_" + active_grouping.name
+        rename_grouping(active_grouping, "unlinked_" + active_grouping.name)
+        invalidate_registry(context.scene)
 
         context.scene.BookGenAddonProperties.active_shelf -= 1
 
@@ -0,0 +1,270 @@
+"""
+This file contains the base class of shelves and stacks. It adds the books computed by the layout core to the scene.
+"""
+
+# ====================== BEGIN GPL LICENSE BLOCK ======================
+#    This file is part of the  bookGen-addon for generating books in Blender
+#    Copyright (c) 2014 Oliver Weissbarth
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# ======================= END GPL LICENSE BLOCK ========================
+
+import logging
+
+from .book import Book, update_books
+from .instancing import create_instancing_object, update_instancing_object
+from .mesh import MeshPool, create_merged_object
+from .core import find_archetypes
+from .core.stats import measure
+from .core.template import VERTEX_COUNT
+from .registry import find_grouping
+
+from .utils import (
+    compose_book_name,
+    discard_staging_collection,
+    get_settings_by_name,
+    get_shelf_collection,
+    get_shelf_parameters,
+    get_stack_parameters,
+    new_staging_collection,
+    remove_grouping_books,
+    swap_grouping_books,
+)
+
+
+class Grouping:
+    """
+    Describes a grouping of books.
+    Subclasses set up the layout that computes the books. This class adds the books to the scene.
+    """
+
+    log = logging.getLogger("bookGen.Grouping")
+    parameters = {}
+    batch = None
+
+    def __init__(self, name, layout, parameters):
+        self.name = name
+        self.layout = layout
+        self.parameters = parameters
+        self.collection = None
+        self.batch = None
+
+    def to_collection(self, context, with_uvs=False):
+        """Converts the grouping to a blender collection and adds the books as blender objects.
+        The previous books are removed first so that the new ones are created under their final names.
+        The new books are built in an unlinked staging collection and only linked once all of them were created.
+        If building fails they are discarded and the grouping is left empty and dirty.
+
+        Args:
+            with_uvs (bool, optional): Whether to generate UVs for the books. Defaults to False.
+        """
+        for _ in self.to_collection_steps(context, with_uvs):
+            pass
+
+    def to_collection_steps(self, context, with_uvs=False, chunk_size=None):
+        """Like to_collection but builds the books in chunks. Iterate the returned generator to build the next chunk.
+        The new books are swapped in once the generator is exhausted. Closing it early discards them.
+
+        Args:
+            with_uvs (bool, optional): Whether to generate UVs for the books. Defaults to False.
+            chunk_size (int, optional): the number of books per chunk. Defaults to None for a single chunk.
+
+        Yields:
+            int: the number of books built so far
+        """
+        self.collection = get_shelf_collection(context, self.name)
+        remove_grouping_books(self.collection)
+        staging = new_staging_collection(self.collection)
+        try:
+            yield from self.build_steps(staging, with_uvs, chunk_size, name=self.collection.name)
+        except BaseException:
+            # also covers GeneratorExit if the build is cancelled
+            discard_staging_collection(staging)
+            raise
+        swap_grouping_books(self.collection, staging)
+
+    def build_steps(self, collection, with_uvs=False, chunk_size=None, name=None):
+        """Adds the books of the grouping to a collection in chunks
+
+        Args:
+            collection (bpy.types.Collection): the empty collection
+            with_uvs (bool, optional): Whether to generate UVs for the books. Defaults to False.
+            chunk_size (int, optional): the number of books per chunk. Defaults to None for a single chunk.
+                Merged and instanced groupings are always built in a single chunk.
+            name (str, optional): the name the books are named after. Defaults to None for the collection name.
+
+        Yields:
+            int: the number of books built so far
+        """
+        if name is None:
+            name = collection.name
+
+        if self.parameters["output_mode"] == "MERGED":
+            with measure("to_object"):
+                obj = create_merged_object(
+                    name,
+                    self.batch,
+                    with_uvs,
+                    subsurf=self.parameters["subsurf"],
+                    cover_material=self.parameters["cover_material"],
+                    page_material=self.parameters["page_material"],
+                )
+            with measure("linking"):
+                collection.objects.link(obj)
+            yield len(self.batch)
+            return
+
+        if self.parameters["output_mode"] == "INSTANCES":
+            with measure("to_object"):
+                obj, archetypes = create_instancing_object(
+                    name,
+                    self.batch,
+                    with_uvs,
+                    subsurf=self.parameters["subsurf"],
+                    cover_material=self.parameters["cover_material"],
+                    page_material=self.parameters["page_material"],
+                    tolerance=self.parameters["archetype_tolerance"],
+                )
+            with measure("linking"):
+                collection.objects.link(obj)
+                collection.BookGenGroupingProperties.archetypes = archetypes
+            yield len(self.batch)
+            return
+
+        mesh_pool = MeshPool(name, with_uvs, self.parameters["cover_material"], self.parameters["page_material"])
+        archetypes = None
+        if self.parameters["archetype_tolerance"] > 0:
+            archetypes = find_archetypes(self.batch, self.parameters["archetype_tolerance"])
+
+        for index in range(len(self.batch)):
+            book = Book(
+                self.batch,
+                index,
+                name=compose_book_name(name, index),
+                subsurf=self.parameters["subsurf"],
+                cover_material=self.parameters["cover_material"],
+                page_material=self.parameters["page_material"],
+            )
+            with measure("to_object"):
+                obj = book.to_object(with_uvs, mesh_pool, archetypes)
+            with measure("linking"):
+                collection.objects.link(obj)
+            if chunk_size and (index + 1) % chunk_size == 0 and index + 1 < len(self.batch):
+                yield index + 1
+        yield len(self.batch)
+
+    def update_collection(self, context, with_uvs=False):
+        """Updates the books of the grouping in place. Existing objects and meshes of separate books
+        and the point object and archetypes of instanced groupings are reused.
+        Falls back to removing and recreating the books if they can not be reused e.g. because the output mode changed.
+
+        Args:
+            with_uvs (bool, optional): Whether to generate UVs for the books. Defaults to False.
+        """
+        self.collection = get_shelf_collection(context, self.name)
+        update = {"OBJECTS": update_books, "INSTANCES": update_instancing_object}.get(self.parameters["output_mode"])
+        if update is not None and update(
+            self.collection,
+            self.batch,
+            with_uvs,
+            subsurf=self.parameters["subsurf"],
+            cover_material=self.parameters["cover_material"],
+            page_material=self.parameters["page_material"],
+            tolerance=self.parameters["archetype_tolerance"],
+        ):
+            return
+
+        self.to_collection(context, with_uvs)
+
+    def fill(self, sequence=None):
+        """Fills the grouping with books
+
+        Args:
+            sequence (BookSequence, optional): previously sampled books with the same parameters
+        """
+        with measure("fill"):
+            self.batch = self.layout.fill(sequence)
+
+    def clean(self, context):
+        """Removes all books of the grouping and their meshes from the scene"""
+        collection = self.collection
+        if collection is None:
+            collection = find_grouping(context.scene, self.name)
+        if collection is None:
+            return
+        remove_grouping_books(collection)
+
+    def count(self, stats):
+        """Stores the number of books, vertices and objects of the grouping in its stats
+
+        Args:
+            stats (GroupingStats): the stats of the grouping
+        """
+        stats.books = len(self.batch) if self.batch is not None else 0
+        stats.vertices = stats.books * VERTEX_COUNT
+        stats.objects = 0
+        if self.collection is not None:
+            stats.objects = len(self.collection.objects)
+            archetypes = self.collection.BookGenGroupingProperties.archetypes
+            if archetypes is not None:
+                stats.objects += len(archetypes.objects)
+
+    def get_geometry(self):
+        """Returns the raw geometry of the grouping for previz
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): a tuple containing the vertices and the face indices
+        """
+        return self.layout.get_geometry()
+
+
+def create_grouping(context, grouping_collection):
+    """Creates the shelf or stack described by a grouping collection
+
+    Args:
+        context (bpy.types.Context): the execution context
+        grouping_collection (bpy.types.Collection): the collection of the grouping
+
+    Returns:
+        (Grouping, Dict[str, any]): the shelf or stack and its parameters or (None, None) if it has no settings
+    """
+    # imported here because shelves and stacks derive from Grouping
+    from .shelf import Shelf
+    from .stack import Stack
+
+    grouping_props = grouping_collection.BookGenGroupingProperties
+    settings = get_settings_by_name(context, grouping_props.settings_name)
+    if not settings:
+        return None, None
+
+    if grouping_props.grouping_type == "SHELF":
+        parameters = get_shelf_parameters(context, grouping_props.id, settings)
+        grouping = Shelf(
+            grouping_collection.name,
+            grouping_props.start,
+            grouping_props.end,
+            grouping_props.normal,
+            parameters,
+        )
+    else:
+        parameters = get_stack_parameters(context, grouping_props.id, settings)
+        grouping = Stack(
+            grouping_collection.name,
+            grouping_props.origin,
+            grouping_props.forward,
+            grouping_props.normal,
+            grouping_props.height,
+            parameters,
+        )
+    return grouping, parameters
@@ -0,0 +1,303 @@
+"""
+Contains the geometry nodes backend. A grouping is exported as a single object with one point per book
+and a geometry nodes modifier that instances the archetype meshes on the points.
+"""
+
+import numpy as np
+
+import bpy
+
+from .core import find_archetypes
+from .core.stats import measure
+from .core.transform import decompose_matrices
+from .mesh import MeshPool, UpdateJournal, set_subsurf
+
+MODIFIER_NAME = "BookGen Instances"
+# the point attributes read by the node group, their data types and the name of their values
+POINT_ATTRIBUTES = (
+    ("rotation", "FLOAT_VECTOR", "vector"),
+    ("scale", "FLOAT_VECTOR", "vector"),
+    ("archetype_index", "INT", "value"),
+)
+
+
+def _new_socket(group, name, in_out, socket_type):
+    """Adds a socket to the interface of a node group
+
+    Args:
+        group (bpy.types.NodeTree): the node group
+        name (str): the name of the socket
+        in_out (str): "INPUT" or "OUTPUT"
+        socket_type (str): the type of the socket e.g. "NodeSocketGeometry"
+    """
+    if bpy.app.version >= (4, 0, 0):
+        group.interface.new_socket(name=name, in_out=in_out, socket_type=socket_type)
+    elif in_out == "INPUT":
+        group.inputs.new(socket_type, name)
+    else:
+        group.outputs.new(socket_type, name)
+
+
+def _named_attribute(group, name, data_type):
+    """Adds a named attribute node and returns its attribute output
+
+    Args:
+        group (bpy.types.NodeTree): the node group
+        name (str): the name of the attribute
+        data_type (str): the data type of the attribute e.g. "FLOAT_VECTOR"
+
+    Returns:
+        bpy.types.NodeSocket: the output socket of the attribute
+    """
+    node = group.nodes.new("GeometryNodeInputNamedAttribute")
+    node.data_type = data_type
+    node.inputs["Name"].default_value = name
+    # older versions have one output per data type, only the one of the selected type is enabled
+    return next(socket for socket in node.outputs if socket.enabled)
+
+
+def create_instancing_node_group(name, archetype_collection):
+    """Creates the geometry nodes that instance the archetypes on the points of a grouping
+
+    Args:
+        name (str): the name of the node group
+        archetype_collection (bpy.types.Collection): the collection containing the archetype objects
+
+    Returns:
+        bpy.types.NodeTree: the node group
+    """
+    group = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    _new_socket(group, "Geometry", "INPUT", "NodeSocketGeometry")
+    _new_socket(group, "Geometry", "OUTPUT", "NodeSocketGeometry")
+
+    group_input = group.nodes.new("NodeGroupInput")
+    group_output = group.nodes.new("NodeGroupOutput")
+
+    # Separate Children sorts the archetypes by name, which matches their index
+    collection_info = group.nodes.new("GeometryNodeCollectionInfo")
+    collection_info.transform_space = "ORIGINAL"
+    collection_info.inputs["Collection"].default_value = archetype_collection
+    collection_info.inputs["Separate Children"].default_value = True
+    collection_info.inputs["Reset Children"].default_value = True
+
+    instance_on_points = group.nodes.new("GeometryNodeInstanceOnPoints")
+    instance_on_points.inputs["Pick Instance"].default_value = True
+
+    links = group.links
+    links.new(group_input.outputs[0], instance_on_points.inputs["Points"])
+    links.new(collection_info.outputs[0], instance_on_points.inputs["Instance"])
+    links.new(_named_attribute(group, "archetype_index", "INT"), instance_on_points.inputs["Instance Index"])
+    links.new(_named_attribute(group, "rotation", "FLOAT_VECTOR"), instance_on_points.inputs["Rotation"])
+    links.new(_named_attribute(group, "scale", "FLOAT_VECTOR"), instance_on_points.inputs["Scale"])
+    links.new(instance_on_points.outputs[0], group_output.inputs[0])
+
+    return group
+
+
+def _update_archetype_objects(archetype_collection, name, archetypes, mesh_pool, subsurf, objects=(), journal=None):
+    """Creates or updates one object per archetype.
+    The node group instances the archetypes in the order of their names, so reused objects are renamed if needed.
+
+    Args:
+        archetype_collection (bpy.types.Collection): the collection of the archetype objects
+        name (str): the name of the grouping
+        archetypes (Archetypes): the archetypes
+        mesh_pool (MeshPool): provides the meshes of the archetypes
+        subsurf (bool): whether the archetypes have a subdivision surface modifier
+        objects (List[bpy.types.Object], optional): the existing archetype objects sorted by name.
+            They are reused in order. Defaults to no objects.
+        journal (UpdateJournal, optional): records the reused and created objects. Defaults to None.
+
+    Returns:
+        List[bpy.types.Object]: the existing objects that are no longer needed
+    """
+    digits = max(4, len(str(len(archetypes) - 1)))
+    for index in range(len(archetypes)):
+        obj_name = "%s.a%0*d" % (name, digits, index)
+        mesh = mesh_pool.get_mesh(archetypes.batch, index)
+        if index < len(objects):
+            obj = objects[index]
+            if journal is not None:
+                journal.backup_object(obj)
+            obj.data = mesh
+            if obj.name != obj_name:
+                obj.name = obj_name
+        else:
+            obj = bpy.data.objects.new(obj_name, mesh)
+            if journal is not None:
+                journal.add_created(obj)
+            archetype_collection.objects.link(obj)
+        set_subsurf(obj, subsurf)
+    return list(objects[len(archetypes) :])
+
+
+def _write_points(mesh, batch, archetypes):
+    """Writes one point per book and its rotation, scale and archetype index to a mesh
+
+    Args:
+        mesh (bpy.types.Mesh): the point mesh. It is resized if the number of books changed.
+        batch (BookBatch): the books
+        archetypes (Archetypes): the archetypes of the books
+    """
+    if len(mesh.vertices) != len(batch):
+        mesh.clear_geometry()
+        mesh.vertices.add(len(batch))
+    mesh.vertices.foreach_set("co", batch.locations.reshape(-1))
+
+    rotations, scales = decompose_matrices(batch.rotations)
+    _write_point_attributes(mesh, (rotations, scales * archetypes.scales, archetypes.indices))
+    mesh.update()
+
+
+def _write_point_attributes(mesh, values):
+    """Writes the point attributes of a point mesh. Missing attributes are added.
+
+    Args:
+        mesh (bpy.types.Mesh): the point mesh
+        values (Sequence[numpy.ndarray]): the values of each attribute of POINT_ATTRIBUTES
+    """
+    for (attribute_name, data_type, value_name), attribute_values in zip(POINT_ATTRIBUTES, values):
+        attribute = mesh.attributes.get(attribute_name)
+        if attribute is None:
+            attribute = mesh.attributes.new(attribute_name, data_type, "POINT")
+        dtype = np.int32 if data_type == "INT" else np.float32
+        attribute.data.foreach_set(value_name, np.ascontiguousarray(attribute_values, dtype=dtype).reshape(-1))
+
+
+def _backup_points(journal, mesh):
+    """Records the points of a point mesh and their attributes before they are overwritten
+
+    Args:
+        journal (UpdateJournal): the journal of the update
+        mesh (bpy.types.Mesh): the point mesh
+    """
+    count = len(mesh.vertices)
+    locations = np.empty(count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", locations)
+    values = []
+    for attribute_name, data_type, value_name in POINT_ATTRIBUTES:
+        size = count * (3 if data_type == "FLOAT_VECTOR" else 1)
+        attribute_values = np.zeros(size, dtype=np.int32 if data_type == "INT" else np.float32)
+        attribute = mesh.attributes.get(attribute_name)
+        # missing attributes are restored with zeros, the default of a new attribute
+        if attribute is not None:
+            attribute.data.foreach_get(value_name, attribute_values)
+        values.append(attribute_values)
+
+    def undo():
+        if len(mesh.vertices) != count:
+            mesh.clear_geometry()
+            mesh.vertices.add(count)
+        mesh.vertices.foreach_set("co", locations)
+        _write_point_attributes(mesh, values)
+        mesh.update()
+
+    journal.add_undo(undo)
+
+
+def create_instancing_object(
+    name,
+    batch,
+    with_uvs=False,
+    subsurf=False,
+    cover_material=None,
+    page_material=None,
+    tolerance=0.0,
+):
+    """Exports the books of a batch as points that instance archetype meshes with geometry nodes.
+
+    The points are the vertices of a mesh without faces. They store the rotation as XYZ euler angles,
+    the scale and the index of the archetype of each book as point attributes.
+
+    Args:
+        name (str): the name of the object
+        batch (BookBatch): the books
+        with_uvs (bool, optional): whether to generate uvs for the archetypes. Defaults to False.
+        subsurf (bool, optional): whether to add a subdivision surface modifier to the archetypes.
+            Defaults to False.
+        cover_material (bpy.types.Material, optional): the material of the covers. Defaults to None.
+        page_material (bpy.types.Material, optional): the material of the pages. Defaults to None.
+        tolerance (float, optional): the maximum shape error of the archetypes. Defaults to 0.
+
+    Returns:
+        (bpy.types.Object, bpy.types.Collection): the point object and the collection of archetype objects.
+            The archetype collection is not linked to the scene.
+    """
+    archetypes = find_archetypes(batch, tolerance)
+
+    archetype_collection = bpy.data.collections.new(name + ".archetypes")
+    mesh_pool = MeshPool(name, with_uvs, cover_material, page_material)
+    _update_archetype_objects(archetype_collection, name, archetypes, mesh_pool, subsurf)
+
+    mesh = bpy.data.meshes.new(name)
+    _write_points(mesh, batch, archetypes)
+
+    obj = bpy.data.objects.new(name, mesh)
+    modifier = obj.modifiers.new(MODIFIER_NAME, type="NODES")
+    modifier.node_group = create_instancing_node_group(name + ".instances", archetype_collection)
+
+    return obj, archetype_collection
+
+
+def update_instancing_object(
+    collection,
+    batch,
+    with_uvs=False,
+    subsurf=False,
+    cover_material=None,
+    page_material=None,
+    tolerance=0.0,
+):
+    """Updates an instanced grouping in place.
+
+    The point object and the node group are kept. Only the point attributes are rewritten
+    and the meshes of the archetypes are overwritten. Archetype objects are only added or removed
+    if the number of archetypes changed. If the update fails, the previous books are restored.
+
+    Args:
+        collection (bpy.types.Collection): the collection of the grouping
+        batch (BookBatch): the new books
+        with_uvs (bool, optional): whether to generate uvs for the archetypes. Defaults to False.
+        subsurf (bool, optional): whether the archetypes have a subdivision surface modifier. Defaults to False.
+        cover_material (bpy.types.Material, optional): the material of the covers. Defaults to None.
+        page_material (bpy.types.Material, optional): the material of the pages. Defaults to None.
+        tolerance (float, optional): the maximum shape error of the archetypes. Defaults to 0.
+
+    Returns:
+        bool: False if the collection does not contain an instanced grouping. Nothing is changed in that case.
+    """
+    archetype_collection = collection.BookGenGroupingProperties.archetypes
+    if archetype_collection is None or len(collection.objects) != 1:
+        return False
+    obj = collection.objects[0]
+    modifier = obj.modifiers.get(MODIFIER_NAME) if obj.type == "MESH" else None
+    if modifier is None or modifier.node_group is None:
+        return False
+
+    journal = UpdateJournal()
+    with measure("to_object"):
+        archetypes = find_archetypes(batch, tolerance)
+        # sorted by name, which is the order the archetypes are instanced in. The meshes keep their names as well.
+        archetype_objects = sorted(archetype_collection.objects, key=lambda archetype: archetype.name)
+        meshes = {archetype.data.as_pointer(): archetype.data for archetype in archetype_objects}
+        mesh_pool = MeshPool(
+            collection.name, with_uvs, cover_material, page_material, reusable=meshes.values(), journal=journal
+        )
+        mesh_pool.prepare(archetypes.batch)
+
+    try:
+        with measure("to_object"):
+            unused = _update_archetype_objects(
+                archetype_collection, collection.name, archetypes, mesh_pool, subsurf, archetype_objects, journal
+            )
+            _backup_points(journal, obj.data)
+            _write_points(obj.data, batch, archetypes)
+    except BaseException:
+        # restores the previous books, so a failed or interrupted update does not leave them half overwritten
+        journal.rollback()
+        raise
+
+    with measure("cleanup"):
+        bpy.data.batch_remove(unused + mesh_pool.reusable)
+
+    return True
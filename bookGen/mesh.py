@@ -0,0 +1,425 @@
+"""
+Contains the construction of book meshes from numpy arrays.
+The mesh data is written with foreach_set instead of creating every element through bmesh.
+"""
+
+from math import radians
+
+import numpy as np
+
+import bpy
+
+from .core.stats import measure
+from .core.topology import (
+    CREASE_WEIGHTS,
+    EDGE_KEYS,
+    FACE_COUNT,
+    LOOP_EDGES,
+    LOOP_STARTS,
+    LOOP_TOTALS,
+    LOOP_VERTICES,
+    PAGE_FACE_MASK,
+)
+from .utils import compose_mesh_name
+
+# the attributes that store the result of set_smooth_angle since blender 4.1 and their domains
+SMOOTHING_ATTRIBUTES = {"sharp_edge": "EDGE", "sharp_face": "FACE"}
+
+
+def fill_mesh(mesh, vertices, uvs=None, page_material_index=None):
+    """Writes the geometry of one or more books into an empty mesh
+
+    Args:
+        mesh (bpy.types.Mesh): the empty mesh
+        vertices (numpy.ndarray): the vertices of the books (n, 44, 3)
+        uvs (numpy.ndarray, optional): the uvs of the books (n, 152, 2). Defaults to None.
+        page_material_index (int, optional): the material index of the page faces. Defaults to None.
+    """
+    count, vertices_per_book, _ = vertices.shape
+    loops_per_book = len(LOOP_VERTICES)
+    face_count = count * FACE_COUNT
+
+    vertex_offsets = np.arange(count, dtype=np.int32)[:, np.newaxis] * vertices_per_book
+    edge_offsets = np.arange(count, dtype=np.int32)[:, np.newaxis] * len(EDGE_KEYS)
+    loop_offsets = np.arange(count, dtype=np.int32)[:, np.newaxis] * loops_per_book
+
+    mesh.vertices.add(count * vertices_per_book)
+
+    mesh.edges.add(count * len(EDGE_KEYS))
+    mesh.edges.foreach_set("vertices", (EDGE_KEYS[np.newaxis] + vertex_offsets[:, :, np.newaxis]).reshape(-1))
+
+    mesh.loops.add(count * loops_per_book)
+    mesh.loops.foreach_set("vertex_index", (LOOP_VERTICES[np.newaxis] + vertex_offsets).reshape(-1))
+    mesh.loops.foreach_set("edge_index", (LOOP_EDGES[np.newaxis] + edge_offsets).reshape(-1))
+
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set("loop_start", (LOOP_STARTS[np.newaxis] + loop_offsets).reshape(-1))
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", np.tile(LOOP_TOTALS, count))
+    mesh.polygons.foreach_set("use_smooth", np.ones(face_count, dtype=bool))
+
+    crease_layer = mesh.attributes.new("crease_edge", "FLOAT", "EDGE")
+    crease_layer.data.foreach_set("value", np.tile(CREASE_WEIGHTS, count))
+
+    update_mesh(mesh, vertices, uvs, page_material_index)
+
+
+def update_mesh(mesh, vertices, uvs=None, page_material_index=None):
+    """Overwrites the vertices, uvs and material indices of a mesh filled with the same number of books.
+    The topology of a book never changes so it is left untouched.
+
+    Args:
+        mesh (bpy.types.Mesh): the mesh created by fill_mesh
+        vertices (numpy.ndarray): the vertices of the books (n, 44, 3)
+        uvs (numpy.ndarray, optional): the uvs of the books (n, 152, 2). Existing uvs are removed if None.
+            Defaults to None.
+        page_material_index (int, optional): the material index of the page faces. Defaults to None.
+    """
+    count = len(vertices)
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1))
+
+    if uvs is not None:
+        uv_layer = mesh.uv_layers.active or mesh.uv_layers.new()
+        uv_layer.data.foreach_set("uv", np.ascontiguousarray(uvs, dtype=np.float32).reshape(-1))
+    else:
+        while mesh.uv_layers:
+            mesh.uv_layers.remove(mesh.uv_layers[0])
+
+    material_indices = np.where(PAGE_FACE_MASK, page_material_index or 0, 0).astype(np.int32)
+    mesh.polygons.foreach_set("material_index", np.tile(material_indices, count))
+
+    mesh.update()
+
+
+def get_smooth_angle(vertices):
+    """Returns the auto smooth angle based on the spine of one or more books
+
+    Args:
+        vertices (numpy.ndarray): the object-space vertices of the books (44, 3) or (n, 44, 3)
+
+    Returns:
+        float: the angle in radians. For multiple books the largest angle is used so that all spines stay smooth.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 44, 3)
+    center = vertices[:, -1]
+    side = vertices[:, -5]
+    curl = np.abs(center[:, 1] - side[:, 1])
+    width = np.abs(center[:, 0] - side[:, 0])
+    spine_angle = np.arctan(width / curl) * 2
+    normal_angles = radians(180) - spine_angle + radians(1)  # add 1 deg to account for fp
+    return float(normal_angles.max())
+
+
+def set_smooth_angle(mesh, angle):
+    """Marks edges sharper than the angle as sharp
+
+    Args:
+        mesh (bpy.types.Mesh): the mesh
+        angle (float): the angle in radians
+    """
+    if bpy.app.version >= (4, 1, 0):
+        mesh.set_sharp_from_angle(angle=angle)
+    else:
+        mesh.use_auto_smooth = True
+        mesh.auto_smooth_angle = angle
+
+
+def get_smoothing(mesh):
+    """Returns the sharp edges and faces of a mesh or its auto smooth settings before blender 4.1
+
+    Args:
+        mesh (bpy.types.Mesh): the mesh
+
+    Returns:
+        tuple: the state that is passed to restore_smoothing
+    """
+    if bpy.app.version < (4, 1, 0):
+        return mesh.use_auto_smooth, mesh.auto_smooth_angle
+
+    state = []
+    for name in SMOOTHING_ATTRIBUTES:
+        attribute = mesh.attributes.get(name)
+        values = None
+        if attribute is not None:
+            values = np.empty(len(attribute.data), dtype=bool)
+            attribute.data.foreach_get("value", values)
+        state.append(values)
+    return tuple(state)
+
+
+def restore_smoothing(mesh, state):
+    """Restores the sharp edges and faces of a mesh returned by get_smoothing
+
+    Args:
+        mesh (bpy.types.Mesh): the mesh
+        state (tuple): the state returned by get_smoothing
+    """
+    if bpy.app.version < (4, 1, 0):
+        mesh.use_auto_smooth, mesh.auto_smooth_angle = state
+        return
+
+    for (name, domain), values in zip(SMOOTHING_ATTRIBUTES.items(), state):
+        attribute = mesh.attributes.get(name)
+        if values is None:
+            if attribute is not None:
+                mesh.attributes.remove(attribute)
+            continue
+        if attribute is None:
+            attribute = mesh.attributes.new(name, "BOOLEAN", domain)
+        attribute.data.foreach_set("value", values)
+
+
+def add_subsurf(obj):
+    """Adds a subdivision surface modifier to an object
+
+    Args:
+        obj (bpy.types.Object): the object containing one or more books
+    """
+    obj.modifiers.new("Subdivision Surface", type="SUBSURF")
+    obj.modifiers["Subdivision Surface"].levels = 1
+
+
+def set_subsurf(obj, subsurf):
+    """Adds or removes the subdivision surface modifier of an object
+
+    Args:
+        obj (bpy.types.Object): the object containing one or more books
+        subsurf (bool): whether the object should have a subdivision surface modifier
+    """
+    modifier = obj.modifiers.get("Subdivision Surface")
+    if subsurf and modifier is None:
+        add_subsurf(obj)
+    elif not subsurf and modifier is not None:
+        obj.modifiers.remove(modifier)
+
+
+def add_materials(mesh, cover_material=None, page_material=None):
+    """Adds the materials of the book settings to a mesh
+
+    Args:
+        mesh (bpy.types.Mesh): the mesh containing one or more books
+        cover_material (bpy.types.Material, optional): the material of the covers. Defaults to None.
+        page_material (bpy.types.Material, optional): the material of the pages. Defaults to None.
+    """
+    with measure("materials"):
+        if cover_material:
+            mesh.materials.append(cover_material)
+
+        if page_material:
+            mesh.materials.append(page_material)
+
+
+class UpdateJournal:
+    """
+    Records the changes of an in-place update, so that the previous books can be restored if the update fails.
+    Every datablock is backed up before it is overwritten. Datablocks that are no longer needed
+    must only be removed once the update succeeded.
+    """
+
+    def __init__(self):
+        self.created = []
+        self.undo = []
+
+    def add_created(self, datablock):
+        """Records a datablock that did not exist before the update
+
+        Args:
+            datablock (bpy.types.ID): the new datablock
+        """
+        self.created.append(datablock)
+
+    def add_undo(self, undo):
+        """Records a function that reverts a change
+
+        Args:
+            undo (Callable[[], None]): the function
+        """
+        self.undo.append(undo)
+
+    def backup_mesh(self, mesh):
+        """Records the name, vertices, uvs, materials and sharp edges of a book mesh before it is overwritten
+
+        Args:
+            mesh (bpy.types.Mesh): the mesh created by fill_mesh
+        """
+        name = mesh.name
+        vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", vertices)
+        uvs = None
+        if mesh.uv_layers.active is not None:
+            uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            mesh.uv_layers.active.data.foreach_get("uv", uvs)
+        material_indices = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", material_indices)
+        materials = list(mesh.materials)
+        smoothing = get_smoothing(mesh)
+
+        def undo():
+            if mesh.name != name:
+                mesh.name = name
+            mesh.vertices.foreach_set("co", vertices)
+            if uvs is not None:
+                (mesh.uv_layers.active or mesh.uv_layers.new()).data.foreach_set("uv", uvs)
+            else:
+                while mesh.uv_layers:
+                    mesh.uv_layers.remove(mesh.uv_layers[0])
+            mesh.polygons.foreach_set("material_index", material_indices)
+            mesh.materials.clear()
+            for material in materials:
+                mesh.materials.append(material)
+            restore_smoothing(mesh, smoothing)
+            mesh.update()
+
+        self.add_undo(undo)
+
+    def backup_object(self, obj):
+        """Records the name, mesh and subdivision surface modifier of a book object before it is reused
+
+        Args:
+            obj (bpy.types.Object): the object
+        """
+        name = obj.name
+        mesh = obj.data
+        subsurf = obj.modifiers.get("Subdivision Surface") is not None
+
+        def undo():
+            if obj.name != name:
+                obj.name = name
+            obj.data = mesh
+            set_subsurf(obj, subsurf)
+
+        self.add_undo(undo)
+
+    def backup_matrices(self, collection):
+        """Records the transforms of all objects of a collection before they are overwritten
+
+        Args:
+            collection (bpy.types.Collection): the collection
+
+        Returns:
+            numpy.ndarray: the flattened column-major matrices of the objects. It must not be modified.
+        """
+        objects = list(collection.objects)
+        matrices = np.empty(len(objects) * 16, dtype=np.float32)
+        collection.objects.foreach_get("matrix_world", matrices)
+
+        def undo():
+            collection.objects.foreach_set("matrix_world", matrices)
+            for obj in objects:
+                obj.update_tag(refresh={"OBJECT"})
+
+        self.add_undo(undo)
+        return matrices
+
+    def rollback(self):
+        """Reverts all recorded changes in reverse order and removes the created datablocks"""
+        for undo in reversed(self.undo):
+            undo()
+        bpy.data.batch_remove(self.created)
+        self.undo.clear()
+        self.created.clear()
+
+
+class MeshPool:
+    """
+    Shares one mesh between all books with identical shape parameters.
+    The books then only differ by their object transform.
+    Existing book meshes can be passed in to be overwritten instead of creating new ones.
+    Meshes that are left in reusable afterwards are no longer needed.
+    If a journal is given, reused meshes are backed up and new meshes are recorded in it.
+    """
+
+    def __init__(self, name, with_uvs=False, cover_material=None, page_material=None, reusable=None, journal=None):
+        self.name = name
+        self.with_uvs = with_uvs
+        self.cover_material = cover_material
+        self.page_material = page_material
+        # reversed so that pop() hands out the meshes in their original order and they keep their names
+        self.reusable = list(reusable)[::-1] if reusable is not None else []
+        self.meshes = {}
+        self.journal = journal
+
+    def prepare(self, batch):
+        """Computes the vertices and uvs of a batch in advance. The batch caches them,
+        so an in-place update does not fail halfway through because of them.
+
+        Args:
+            batch (BookBatch): the books whose meshes are requested
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): the vertices and the uvs or None if no uvs are generated
+        """
+        return batch.vertices, batch.uvs if self.with_uvs else None
+
+    def get_mesh(self, batch, index):
+        """Returns the mesh of a book. The mesh is only created for the first book with these parameters.
+
+        Args:
+            batch (BookBatch): the books
+            index (int): the index of the book in the batch
+
+        Returns:
+            bpy.types.Mesh: the object-space mesh of the book
+        """
+        key = batch.parameters[index].tobytes()
+        mesh = self.meshes.get(key)
+        if mesh is not None:
+            return mesh
+
+        vertices = batch.vertices[index : index + 1]
+        uvs = batch.uvs[index : index + 1] if self.with_uvs else None
+
+        name = compose_mesh_name(self.name, len(self.meshes))
+        page_material_index = 1 if self.page_material else None
+        if self.reusable:
+            mesh = self.reusable.pop()
+            if self.journal is not None:
+                self.journal.backup_mesh(mesh)
+            if mesh.name != name:
+                mesh.name = name
+            update_mesh(mesh, vertices, uvs, page_material_index)
+            mesh.materials.clear()
+        else:
+            mesh = bpy.data.meshes.new(name)
+            if self.journal is not None:
+                self.journal.add_created(mesh)
+            fill_mesh(mesh, vertices, uvs, page_material_index)
+        add_materials(mesh, self.cover_material, self.page_material)
+        set_smooth_angle(mesh, get_smooth_angle(vertices[0]))
+
+        self.meshes[key] = mesh
+        return mesh
+
+
+def create_merged_object(name, batch, with_uvs=False, subsurf=False, cover_material=None, page_material=None):
+    """Exports all books of a batch as a single object.
+    The books are merged in world-space and every face stores the index of its book in the "book_id" attribute.
+
+    Args:
+        name (str): the name of the object and the mesh
+        batch (BookBatch): the books
+        with_uvs (bool, optional): whether to generate uvs. Defaults to False.
+        subsurf (bool, optional): whether to add a subdivision surface modifier. Defaults to False.
+        cover_material (bpy.types.Material, optional): the material of the covers. Defaults to None.
+        page_material (bpy.types.Material, optional): the material of the pages. Defaults to None.
+
+    Returns:
+        bpy.types.Object: the merged object
+    """
+    mesh = bpy.data.meshes.new(name)
+    uvs = batch.uvs if with_uvs else None
+    fill_mesh(mesh, batch.get_world_vertices(), uvs, page_material_index=1 if page_material else None)
+
+    book_ids = mesh.attributes.new("book_id", "INT", "FACE")
+    book_ids.data.foreach_set("value", np.repeat(np.arange(len(batch), dtype=np.int32), FACE_COUNT))
+
+    add_materials(mesh, cover_material, page_material)
+
+    obj = bpy.data.objects.new(name, mesh)
+    if subsurf:
+        add_subsurf(obj)
+
+    if len(batch) > 0:
+        set_smooth_angle(mesh, get_smooth_angle(batch.vertices))
+
+    return obj
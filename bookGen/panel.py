@@ -4,6 +4,7 @@ This file contains the UI panels.
 
 import bpy
 
+from .core.stats import PHASES, get_last_rebuild
 from .utils import (
     get_bookgen_collection,
     get_active_settings,
@@ -255,6 +256,10 @@ class BOOKGEN_PT_DetailsPanel(bpy.types.Panel):
         layout.separator()
 
         layout.prop(properties, "subsurf")
+        layout.prop(properties, "output_mode", text="Output")
+        row = layout.row()
+        row.active = properties.output_mode != "MERGED"
+        row.prop(properties, "archetype_tolerance", text="Max Shape Error")
 
 
 class BOOKGEN_PT_MainPanel(bpy.types.Panel):
@@ -289,6 +294,7 @@ class BOOKGEN_PT_MainPanel(bpy.types.Panel):
         row = layout.row()
         row.scale_y = 1.5
         row.operator("bookgen.rebuild", text="Rebuild", icon_value=icons["rebuild"].icon_id)
+        row.operator("bookgen.rebuild_async", text="", icon="TIME")
         layout.prop(properties, "auto_rebuild")
 
         if not has_bookgen_collection(context):
@@ -326,3 +332,51 @@ class BOOKGEN_PT_MainPanel(bpy.types.Panel):
         else:
             row.operator("bookgen.create_settings", text="", icon="ADD", emboss=True)
         row.operator("bookgen.remove_settings", text="", icon="X")
+
+
+class BOOKGEN_PT_PerformancePanel(bpy.types.Panel):
+    """
+    Draws the time spent in each phase of the last rebuild
+    """
+
+    bl_label = "Performance"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "BookGen"
+    bl_options = {"DEFAULT_CLOSED"}
+    bl_parent_id = "BOOKGEN_PT_MainPanel"
+
+    max_groupings = 10
+
+    def draw(self, context):
+        """Draws the performance panel
+
+        Args:
+            context (bpy.types.Context): the execution context
+        """
+        layout = self.layout
+        rebuild_stats = get_last_rebuild()
+        if rebuild_stats is None or not rebuild_stats.groupings:
+            layout.label(text="Rebuild to collect timings")
+            return
+
+        totals = rebuild_stats.to_dict()
+        col = layout.column(align=True)
+        col.label(text="Total: %.3f secs" % totals["total"])
+        col.label(text="%d books, %d vertices, %d objects" % (totals["books"], totals["vertices"], totals["objects"]))
+
+        # the slowest groupings first
+        groupings = sorted(rebuild_stats.groupings, key=lambda stats: stats.total, reverse=True)
+        for stats in groupings[: self.max_groupings]:
+            box = layout.box()
+            col = box.column(align=True)
+            col.label(text="%s: %.3f secs" % (stats.name, stats.total))
+            col.label(text="%d books, %d vertices, %d objects" % (stats.books, stats.vertices, stats.objects))
+            for phase in PHASES:
+                row = col.row()
+                row.label(text=phase)
+                row.label(text="%.4f" % stats.phases[phase])
+        if len(groupings) > self.max_groupings:
+            layout.label(text="%d more groupings" % (len(groupings) - self.max_groupings))
+
+        layout.operator("bookgen.export_stats", icon="EXPORT")
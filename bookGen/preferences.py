@@ -2,7 +2,7 @@
 Contains the preferences of bookGen that allow adjust the overall behavior
 """
 from bpy.types import AddonPreferences
-from bpy.props import BoolProperty
+from bpy.props import BoolProperty, FloatProperty, IntProperty, StringProperty
 
 
 class BOOKGEN_AddonPreferences(AddonPreferences):
@@ -14,8 +14,38 @@ class BOOKGEN_AddonPreferences(AddonPreferences):
 
     lazy_update: BoolProperty(
         name="Use lazy update",
+        default=True,
+        description="Shows a fast preview while settings are changed and rebuilds the books once the changes stop",
+    )
+    lazy_update_delay: FloatProperty(
+        name="Idle delay",
+        default=1.0,
+        min=0.1,
+        soft_max=5.0,
+        description="Time in seconds without changes after which the books are rebuilt",
+    )
+    profile_cprofile: BoolProperty(
+        name="Capture cProfile",
+        default=False,
+        description="Profiles rebuilds, shelf and stack placement and setting changes and writes a .prof file each",
+    )
+    profile_tracemalloc: BoolProperty(
+        name="Capture allocations",
         default=False,
-        description="Shows a fast preview when changes settings. CAN BE UNSTABLE WITH THE NEW UNDO SYSTEM",
+        description="Traces memory allocations of rebuilds, shelf and stack placement and setting changes "
+        "and writes a report of the largest ones",
+    )
+    profile_directory: StringProperty(
+        name="Output directory",
+        default="",
+        subtype="DIR_PATH",
+        description="Directory the captures are written to. Uses the temporary directory if empty",
+    )
+    profile_top_allocations: IntProperty(
+        name="Reported allocations",
+        default=25,
+        min=1,
+        description="Number of allocations listed in the report",
     )
 
     def draw(self, _context):
@@ -25,5 +55,19 @@ class BOOKGEN_AddonPreferences(AddonPreferences):
             _context (bpy.types.Context): the execution context
         """
         layout = self.layout
-        layout.label(text="ATTENTION: THIS CAN BE UNSTABLE WITH THE NEW UNDO SYSTEM. USE WITH CAUTION!")
         layout.prop(self, "lazy_update")
+        row = layout.row()
+        row.active = self.lazy_update
+        row.prop(self, "lazy_update_delay")
+
+        box = layout.box()
+        box.label(text="Profiling")
+        row = box.row()
+        row.prop(self, "profile_cprofile")
+        row.prop(self, "profile_tracemalloc")
+        col = box.column()
+        col.active = self.profile_cprofile or self.profile_tracemalloc
+        col.prop(self, "profile_directory")
+        row = col.row()
+        row.active = self.profile_tracemalloc
+        row.prop(self, "profile_top_allocations")
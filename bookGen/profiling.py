@@ -0,0 +1,201 @@
+"""
+Contains optional cProfile and tracemalloc captures of the operators and property updates of bookGen.
+
+The captures are enabled in the add-on preferences. Each capture writes a .prof file that can be opened with pstats
+or snakeviz and a text report of the largest allocations to the selected directory.
+"""
+
+import cProfile
+import functools
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import bpy
+
+log = logging.getLogger("bookGen.profiling")
+
+# number of frames stored per allocation
+TRACEBACK_LIMIT = 10
+
+# the session that is currently recording. Nested captures are included in it instead of starting their own.
+_active = None
+_capture_count = 0
+
+
+def get_preferences():
+    """Returns the add-on preferences
+
+    Returns:
+        BOOKGEN_AddonPreferences: the preferences or None if the add-on is not registered
+    """
+    addon = bpy.context.preferences.addons.get(__package__)
+    return addon.preferences if addon else None
+
+
+class ProfileSession:
+    """
+    A capture of one or more calls. The profiler only runs while the session is entered,
+    so a modal operator can be captured over all of its events and written once it finished.
+    """
+
+    def __init__(self, label, preferences):
+        global _capture_count
+        _capture_count += 1
+        self.name = "%s-%s-%04d" % (label, time.strftime("%Y%m%d-%H%M%S"), _capture_count)
+        self.directory = bpy.path.abspath(preferences.profile_directory) or tempfile.gettempdir()
+        self.top_allocations = preferences.profile_top_allocations
+        self.profile = cProfile.Profile() if preferences.profile_cprofile else None
+        self.started_tracing = False
+        self.trace = preferences.profile_tracemalloc
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_LIMIT)
+            self.started_tracing = True
+        self.entered = False
+
+    def __enter__(self):
+        global _active
+        if _active is not None:
+            return self
+        _active = self
+        self.entered = True
+        if self.profile is not None:
+            try:
+                self.profile.enable()
+            except ValueError:
+                # another profiler is already running e.g. one started from the python console
+                log.warning("Could not start cProfile for %s", self.name)
+                self.profile = None
+        return self
+
+    def __exit__(self, *_args):
+        global _active
+        if not self.entered:
+            return
+        if self.profile is not None:
+            self.profile.disable()
+        self.entered = False
+        _active = None
+
+    def finish(self):
+        """Writes the capture and stops tracing allocations if this session started it"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # the allocations are written first so that they do not include writing the profile
+            if self.trace and tracemalloc.is_tracing():
+                filepath = os.path.join(self.directory, self.name + ".allocations.txt")
+                self.write_allocations(filepath)
+                log.info("Wrote allocations %s", filepath)
+            if self.profile is not None:
+                filepath = os.path.join(self.directory, self.name + ".prof")
+                self.profile.dump_stats(filepath)
+                log.info("Wrote profile %s", filepath)
+        except OSError:
+            log.exception("Failed to write the capture %s", self.name)
+        finally:
+            if self.started_tracing:
+                tracemalloc.stop()
+
+    def write_allocations(self, filepath):
+        """Writes the largest allocations that are still alive to a text file
+
+        Args:
+            filepath (str): the path of the report
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+        statistics = snapshot.statistics("lineno")
+        current, peak = tracemalloc.get_traced_memory()
+        with open(filepath, "w") as report:
+            report.write("%s\n" % self.name)
+            report.write("current %.1f KiB, peak %.1f KiB\n\n" % (current / 1024, peak / 1024))
+            report.write("Top %d allocations\n" % self.top_allocations)
+            for stat in statistics[: self.top_allocations]:
+                report.write("%s\n" % stat)
+
+
+def new_session(label):
+    """Starts a new capture if it is enabled in the preferences
+
+    Args:
+        label (str): the prefix of the written files
+
+    Returns:
+        ProfileSession: the session or None if profiling is disabled or another capture is recording
+    """
+    if _active is not None:
+        return None
+    preferences = get_preferences()
+    if preferences is None or not (preferences.profile_cprofile or preferences.profile_tracemalloc):
+        return None
+    return ProfileSession(label, preferences)
+
+
+def profiled(label):
+    """Decorator that captures every call of a function, e.g. an operator or an update callback
+
+    Args:
+        label (str): the prefix of the written files
+
+    Returns:
+        Callable: the decorator
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            session = new_session(label)
+            if session is None:
+                return func(*args, **kwargs)
+            try:
+                with session:
+                    return func(*args, **kwargs)
+            finally:
+                session.finish()
+
+        return wrapper
+
+    return decorator
+
+
+def profiled_modal(label):
+    """Decorator for the modal handler of an operator. All events of one invocation are captured in a single session
+    that is written once the operator finished or was cancelled.
+
+    Args:
+        label (str): the prefix of the written files
+
+    Returns:
+        Callable: the decorator
+    """
+
+    def decorator(modal):
+        @functools.wraps(modal)
+        def wrapper(self, context, event):
+            session = getattr(self, "profile_session", None)
+            if session is None:
+                session = new_session(label)
+                if session is None:
+                    return modal(self, context, event)
+                self.profile_session = session
+
+            result = {"CANCELLED"}
+            try:
+                with session:
+                    result = modal(self, context, event)
+            finally:
+                if "FINISHED" in result or "CANCELLED" in result:
+                    self.profile_session = None
+                    session.finish()
+            return result
+
+        return wrapper
+
+    return decorator
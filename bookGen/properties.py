@@ -5,7 +5,6 @@ This file contains the property definitions used to describe the book and shelf
 from math import pi, radians
 import logging
 import time
-import functools
 
 import bpy
 from bpy.props import (
@@ -19,8 +18,11 @@ from bpy.props import (
     StringProperty,
 )
 
+from .api import defer_rebuild
+from .profiling import profiled
+from .registry import invalidate_registry
 from .utils import (
-    get_bookgen_collection,
+    get_groupings_by_settings,
     get_shelf_collection_by_index,
     get_shelf_parameters,
     get_settings_by_name,
@@ -28,22 +30,8 @@ from .utils import (
 )
 from .shelf import Shelf
 from .stack import Stack
+from .scheduler import preview_scheduler
 from .ui_outline import BookGenShelfOutline
-from .ui_preview import BookGenShelfPreview
-
-callback = None
-
-
-def remove_previews(previews):
-    """
-    Remove previews and rebuild all books.
-    """
-    for preview in previews:
-        preview.remove()
-
-    bpy.ops.bookgen.rebuild()
-    bpy.ops.ed.undo_push()
-    return None
 
 
 class BookGenAddonProperties(bpy.types.PropertyGroup):
@@ -54,6 +42,7 @@ class BookGenAddonProperties(bpy.types.PropertyGroup):
     # outline = None
     outline = BookGenShelfOutline()
 
+    @profiled("update_outline")
     def update_outline_active(self, context):
         """
         If the outline was activated, generate the shelf and draw the outline.
@@ -124,10 +113,8 @@ class BookGenProperties(bpy.types.PropertyGroup):
     """
 
     log = logging.getLogger("bookGen.properties")
-    shelf_previews = {}
-    stack_previews = {}
-    f = None
 
+    @profiled("update")
     def update(self, context):
         """Use immediate or lazy update based on add-on preferences
 
@@ -135,93 +122,40 @@ class BookGenProperties(bpy.types.PropertyGroup):
             context (bpy.types.Context): the execution context
         """
         preferences = context.preferences.addons["bookGen"].preferences
-        if "lazy_update" in preferences.keys() and preferences["lazy_update"]:
-            self.update_delayed(context)
+        if preferences.lazy_update:
+            self.update_delayed(context, preferences.lazy_update_delay)
         else:
             self.update_immediate(context)
 
+    @profiled("update")
     def update_immediate(self, context):
         """
         Updates the scene using the settings in this property group.
         """
+        if defer_rebuild(context.scene):
+            return
+
         time_start = time.time()
         properties = context.scene.BookGenAddonProperties
 
         if properties.auto_rebuild:
-            bpy.ops.bookgen.rebuild()
+            bpy.ops.bookgen.rebuild(dirty_only=True)
             # bpy.ops.ed.undo_push()
 
         self.log.info("Finished populating shelf in %.4f secs", (time.time() - time_start))
 
-    def update_delayed(self, context):
+    def update_delayed(self, context, delay=1.0):
         """
-        Generates a preview of the current shelve configuration and draw it.
-        Sets up a timer to update the scene after a delay of 1 second
+        Draws previews of the groupings affected by the change and rebuilds them once no further changes
+        were made for the given delay.
         """
-
-        global callback
-        time_start = time.time()
-        properties = context.scene.BookGenAddonProperties
-
-        if not properties.auto_rebuild:
+        if defer_rebuild(context.scene):
             return
 
-        for grouping_collection in get_bookgen_collection(context).children:
-            grouping_props = grouping_collection.BookGenGroupingProperties
-            settings = get_settings_by_name(context, grouping_props.settings_name)
-            if not settings:
-                continue
-
-            bpy.ops.bookgen.rebuild(clear=True)
-
-            preview_collection = None
-            if grouping_props.grouping_type == "SHELF":
-                parameters = get_shelf_parameters(context, grouping_props.id, settings)
-
-                grouping = Shelf(
-                    grouping_collection.name,
-                    grouping_props.start,
-                    grouping_props.end,
-                    grouping_props.normal,
-                    parameters,
-                )
-                # grouping.clean(context)
-                grouping.fill()
-                
-                preview_collection = self.shelf_previews
-
-
-            else:
-                parameters = get_stack_parameters(context, grouping_props.id, settings)
-                grouping = Stack(
-                    grouping_collection.name,
-                    grouping_props.origin,
-                    grouping_props.forward,
-                    grouping_props.normal,
-                    grouping_props.height,
-                    parameters,
-                )
-                # grouping.clean(context)
-                grouping.fill()
-
-                preview_collection = self.stack_previews
-
-            if grouping_props.id not in preview_collection.keys():
-                preview = BookGenShelfPreview()
-                preview_collection.update({grouping_props.id: preview})
-            else:
-                preview = preview_collection[grouping_props.id]
-            if preview:
-                preview.update(*grouping.get_geometry(), context)
-
-        self.log.info("Finished populating shelf in %.4f secs", (time.time() - time_start))
-        
-        if callback is not None and bpy.app.timers.is_registered(callback):
-            bpy.app.timers.unregister(callback)
+        if not context.scene.BookGenAddonProperties.auto_rebuild:
+            return
 
-        active_previews = list(self.stack_previews.values()) + list(self.shelf_previews.values())
-        callback = lambda: remove_previews(active_previews)
-        bpy.app.timers.register(callback, first_interval=1.0)
+        preview_scheduler.schedule(context, delay)
 
     def get_name(self):
         return self.get("name", "BookGenSettings")
@@ -230,11 +164,10 @@ class BookGenProperties(bpy.types.PropertyGroup):
         old_name = self.name
         self["name"] = name
         if name != old_name:
-            for collection in get_bookgen_collection(
-                bpy.context
-            ).children:  # TODO we should not use the global context here
-                if collection.BookGenGroupingProperties.settings_name == old_name:
-                    collection.BookGenGroupingProperties.settings_name = name
+            # TODO we should not use the global context here
+            for collection in get_groupings_by_settings(bpy.context, old_name):
+                collection.BookGenGroupingProperties.settings_name = name
+            invalidate_registry(bpy.context.scene)
 
     # general
     name: StringProperty(
@@ -482,6 +415,34 @@ class BookGenProperties(bpy.types.PropertyGroup):
         options=set(),
     )
 
+    output_mode: EnumProperty(
+        name="output",
+        items=(
+            ("OBJECTS", "objects", "add one object per book"),
+            ("MERGED", "merged", "add one object per grouping. The faces store the index of their book"),
+            ("INSTANCES", "instances", "instance archetype meshes on one point per book with geometry nodes"),
+        ),
+        default="OBJECTS",
+        update=update_immediate,
+        options=set(),
+    )
+
+    archetype_tolerance: FloatProperty(
+        name="max error",
+        description=(
+            "Books that differ by less than this share the mesh of an archetype. "
+            "The object scale absorbs the remaining difference. 0 only shares identical books"
+        ),
+        default=0.0,
+        min=0.0,
+        soft_max=0.005,
+        step=0.01,
+        precision=4,
+        unit="LENGTH",
+        update=update,
+        options=set(),
+    )
+
     cover_material: PointerProperty(
         name="Cover Material",
         type=bpy.types.Material,
@@ -528,3 +489,17 @@ class BookGenGroupingProperties(bpy.types.PropertyGroup):
     )
     id: IntProperty(name="id")
     settings_name: StringProperty("Settings name")
+    archetypes: PointerProperty(
+        type=bpy.types.Collection,
+        name="archetypes",
+        description="the archetype objects instanced by the grouping",
+    )
+    content_hash: StringProperty(
+        name="content hash",
+        description="hash of the parameters and placement the books were last built with",
+    )
+    preview_hidden: BoolProperty(
+        name="preview hidden",
+        description="the books were hidden for a preview of the grouping and are shown again once it is removed",
+        default=False,
+    )
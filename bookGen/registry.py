@@ -0,0 +1,238 @@
+"""
+Contains an in-memory index of the groupings and settings of each scene.
+
+Looking up a grouping by name or the groupings of a settings block is a dictionary access instead of a scan over
+all groupings. The index is rebuilt lazily after it was invalidated by one of the handlers or by bookGen itself.
+"""
+
+import logging
+
+import bpy
+from bpy.app.handlers import persistent
+
+log = logging.getLogger("bookGen.registry")
+
+# the registries of all scenes keyed by scene pointer
+_registries = {}
+_msgbus_owner = object()
+
+
+class GroupingRegistry:
+    """
+    The index of the groupings and settings of one scene.
+    """
+
+    def __init__(self, scene):
+        bookgen = scene.BookGenAddonProperties.collection
+        self.bookgen_pointer = bookgen.as_pointer() if bookgen else 0
+        self.groupings = list(bookgen.children) if bookgen else []
+        self.indices = {}
+        self.by_settings = {}
+        for index, collection in enumerate(self.groupings):
+            self.indices[collection.name] = index
+            settings_name = collection.BookGenGroupingProperties.settings_name
+            self.by_settings.setdefault(settings_name, []).append(collection)
+
+        self.settings = {}
+        for settings in scene.BookGenSettings:
+            self.settings.setdefault(settings.name, settings)
+        self.settings_count = len(scene.BookGenSettings)
+
+    def matches(self, scene):
+        """Cheap check for changes that bookGen was not notified about
+
+        Args:
+            scene (bpy.types.Scene): the scene of the registry
+
+        Returns:
+            bool: True if the number of groupings and settings did not change, otherwise False
+        """
+        bookgen = scene.BookGenAddonProperties.collection
+        if (bookgen.as_pointer() if bookgen else 0) != self.bookgen_pointer:
+            return False
+        if len(scene.BookGenSettings) != self.settings_count:
+            return False
+        return (len(bookgen.children) if bookgen else 0) == len(self.groupings)
+
+
+def get_registry(scene):
+    """Returns the registry of a scene and rebuilds it if it is outdated
+
+    Args:
+        scene (bpy.types.Scene): the scene
+
+    Returns:
+        GroupingRegistry: the registry
+    """
+    key = scene.as_pointer()
+    registry = _registries.get(key)
+    if registry is None or not registry.matches(scene):
+        registry = GroupingRegistry(scene)
+        _registries[key] = registry
+        log.debug("Indexed %d groupings", len(registry.groupings))
+    return registry
+
+
+def invalidate_registry(scene=None):
+    """Marks the registry of a scene as outdated
+
+    Args:
+        scene (bpy.types.Scene, optional): the scene. If None the registries of all scenes are invalidated.
+            Defaults to None.
+    """
+    if scene is None:
+        _registries.clear()
+    else:
+        _registries.pop(scene.as_pointer(), None)
+
+
+def _lookup(scene, lookup, verify):
+    """Looks up an entry and rebuilds the registry once if the entry is outdated
+
+    Args:
+        scene (bpy.types.Scene): the scene
+        lookup (Callable[[GroupingRegistry], any]): returns the entry or None
+        verify (Callable[[any], bool]): checks that the entry still describes the scene
+
+    Returns:
+        any: the entry or None
+    """
+    for _ in range(2):
+        entry = lookup(get_registry(scene))
+        try:
+            if entry is None or verify(entry):
+                return entry
+        except ReferenceError:
+            pass
+        invalidate_registry(scene)
+    return None
+
+
+def find_grouping_index(scene, name):
+    """Returns the index of a grouping in the bookGen collection
+
+    Args:
+        scene (bpy.types.Scene): the scene
+        name (str): the name of the grouping
+
+    Returns:
+        int: the index or -1 if there is no such grouping
+    """
+    index = _lookup(
+        scene,
+        lambda registry: registry.indices.get(name),
+        lambda index: get_registry(scene).groupings[index].name == name,
+    )
+    return -1 if index is None else index
+
+
+def find_grouping(scene, name):
+    """Returns the collection of a grouping by name
+
+    Args:
+        scene (bpy.types.Scene): the scene
+        name (str): the name of the grouping
+
+    Returns:
+        bpy.types.Collection: the collection or None
+    """
+    index = find_grouping_index(scene, name)
+    return None if index == -1 else get_registry(scene).groupings[index]
+
+
+def find_settings(scene, name):
+    """Returns the settings with the given name
+
+    Args:
+        scene (bpy.types.Scene): the scene
+        name (str): the name of the settings
+
+    Returns:
+        BookGenProperties: the settings or None
+    """
+    return _lookup(scene, lambda registry: registry.settings.get(name), lambda settings: settings.name == name)
+
+
+def find_groupings_by_settings(scene, settings_name):
+    """Returns the collections of all groupings that use a settings block
+
+    Args:
+        scene (bpy.types.Scene): the scene
+        settings_name (str): the name of the settings
+
+    Returns:
+        List[bpy.types.Collection]: the collections
+    """
+    groupings = _lookup(
+        scene,
+        lambda registry: registry.by_settings.get(settings_name, []),
+        lambda groupings: all(g.BookGenGroupingProperties.settings_name == settings_name for g in groupings),
+    )
+    return list(groupings or [])
+
+
+def is_grouping_name_used(scene, name):
+    """Checks if a grouping with the given name exists
+
+    Args:
+        scene (bpy.types.Scene): the scene
+        name (str): the name of the grouping
+
+    Returns:
+        bool: True if the name is used, otherwise False
+    """
+    return name in get_registry(scene).indices
+
+
+@persistent
+def registry_depsgraph_update(_scene, depsgraph):
+    """Invalidates the registries if collections were added, removed or changed"""
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Collection):
+            invalidate_registry()
+            return
+
+
+@persistent
+def registry_invalidate(*_args):
+    """Invalidates the registries after undo, redo and loading a file. The stored references are outdated then."""
+    invalidate_registry()
+
+
+@persistent
+def registry_load_post(*_args):
+    """Invalidates the registries and subscribes to renames again because loading a file clears subscriptions"""
+    invalidate_registry()
+    _subscribe()
+
+
+def _subscribe():
+    """Subscribes to changes of names and assigned settings that are not visible in the depsgraph"""
+    from .properties import BookGenGroupingProperties, BookGenProperties
+
+    keys = (
+        (bpy.types.Collection, "name"),
+        (BookGenGroupingProperties, "settings_name"),
+        (BookGenProperties, "name"),
+    )
+    for key in keys:
+        bpy.msgbus.subscribe_rna(key=key, owner=_msgbus_owner, args=(), notify=invalidate_registry)
+
+
+def register_handlers():
+    """Registers the handlers that keep the registries up to date"""
+    bpy.app.handlers.depsgraph_update_post.append(registry_depsgraph_update)
+    bpy.app.handlers.undo_post.append(registry_invalidate)
+    bpy.app.handlers.redo_post.append(registry_invalidate)
+    bpy.app.handlers.load_post.append(registry_load_post)
+    _subscribe()
+
+
+def unregister_handlers():
+    """Removes the handlers and subscriptions of the registries"""
+    bpy.app.handlers.depsgraph_update_post.remove(registry_depsgraph_update)
+    bpy.app.handlers.undo_post.remove(registry_invalidate)
+    bpy.app.handlers.redo_post.remove(registry_invalidate)
+    bpy.app.handlers.load_post.remove(registry_load_post)
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    invalidate_registry()
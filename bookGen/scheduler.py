@@ -0,0 +1,206 @@
+"""
+Contains the scheduler for lazy updates. While settings are changed only previews of the affected groupings are drawn.
+The books are rebuilt once the settings were not changed for a while.
+"""
+
+import logging
+import time
+
+import bpy
+from bpy.app.handlers import persistent
+
+from .grouping import create_grouping
+from .ui_preview import BookGenShelfPreview
+from .utils import get_bookgen_collection, get_grouping_hash
+
+
+class PreviewScheduler:
+    """
+    Keeps track of the dirty groupings, draws their previews and commits a dirty-only rebuild after an idle delay.
+    Changes that arrive before the delay passed postpone the rebuild, so a burst of slider changes is rebuilt once.
+    """
+
+    log = logging.getLogger("bookGen.scheduler")
+
+    def __init__(self):
+        self.previews = {}
+        self.dirty = set()
+        self.deadline = 0
+        # timers are identified by the callable, a bound method creates a new one on every access
+        self.callback = self.tick
+
+    def schedule(self, context, delay):
+        """Updates the previews of all groupings whose parameters changed and postpones the rebuild
+
+        Args:
+            context (bpy.types.Context): the execution context
+            delay (float): the idle time in seconds after which the books are rebuilt
+        """
+        time_start = time.time()
+        for grouping_collection in get_bookgen_collection(context).children:
+            grouping, parameters = create_grouping(context, grouping_collection)
+            if grouping is None:
+                continue
+
+            grouping_props = grouping_collection.BookGenGroupingProperties
+            if get_grouping_hash(grouping_props, parameters) == grouping_props.content_hash:
+                if grouping_collection.name in self.dirty:
+                    # the settings were changed back, the existing books are up to date again
+                    self.remove_preview(grouping_collection.name)
+                    hide_books(grouping_collection, False)
+                continue
+
+            grouping.fill()
+            preview = self.previews.get(grouping_collection.name)
+            if preview is None:
+                preview = BookGenShelfPreview()
+                self.previews[grouping_collection.name] = preview
+            preview.update(*grouping.get_geometry(), context)
+
+            if grouping_collection.name not in self.dirty:
+                # the outdated books are hidden while the preview is shown
+                self.dirty.add(grouping_collection.name)
+                hide_books(grouping_collection, True)
+
+        self.log.debug("Updated %d previews in %.4f secs", len(self.dirty), time.time() - time_start)
+
+        self.deadline = time.monotonic() + delay
+        if not bpy.app.timers.is_registered(self.callback):
+            bpy.app.timers.register(self.callback, first_interval=delay)
+
+    def tick(self):
+        """Timer callback. Commits the changes once the idle delay passed.
+
+        Returns:
+            float: the time until the timer is called again or None once the changes are committed
+        """
+        remaining = self.deadline - time.monotonic()
+        if remaining > 0:
+            return remaining
+        self.commit(bpy.context)
+        return None
+
+    def commit(self, _context):
+        """Removes the previews and rebuilds the dirty groupings
+
+        Args:
+            _context (bpy.types.Context): the execution context
+        """
+        self.restore_books()
+        self.remove_previews()
+
+        bpy.ops.bookgen.rebuild(dirty_only=True)
+        bpy.ops.ed.undo_push(message="BookGen rebuild")
+
+    def remove_preview(self, name):
+        """Removes the preview of a grouping and forgets that it is dirty
+
+        Args:
+            name (str): the name of the grouping collection
+        """
+        preview = self.previews.pop(name, None)
+        if preview is not None:
+            preview.remove()
+        self.dirty.discard(name)
+
+    def remove_previews(self):
+        """Removes all previews and forgets the dirty groupings"""
+        for preview in self.previews.values():
+            preview.remove()
+        self.previews.clear()
+        self.dirty.clear()
+
+    def cancel(self):
+        """Drops a pending rebuild e.g. because the scene is about to be replaced by undo. The books are shown again."""
+        if bpy.app.timers.is_registered(self.callback):
+            bpy.app.timers.unregister(self.callback)
+        self.restore_books()
+        self.remove_previews()
+
+    def restore_books(self):
+        """Shows the books of all groupings that were hidden for a preview.
+        This includes groupings that were hidden in an undo step or a saved file, not only the dirty ones.
+        """
+        for collection in bpy.data.collections:
+            if collection.BookGenGroupingProperties.preview_hidden:
+                hide_books(collection, False)
+
+    def hide_dirty_books(self, context):
+        """Hides the books of the dirty groupings again e.g. after they were shown for saving
+
+        Args:
+            context (bpy.types.Context): the execution context
+        """
+        bookgen = get_bookgen_collection(context, create=False)
+        for name in self.dirty:
+            if bookgen is not None and name in bookgen.children:
+                hide_books(bookgen.children[name], True)
+
+
+def hide_books(collection, hidden):
+    """Hides or shows the books of a grouping while its preview is shown.
+    The hidden state is stored in the file, so the grouping is flagged to restore it after undo or loading.
+    Only groupings that were visible are hidden and only flagged ones are shown again,
+    so groupings the user hid stay hidden.
+
+    Args:
+        collection (bpy.types.Collection): the collection of the grouping
+        hidden (bool): whether to hide the books
+    """
+    grouping_props = collection.BookGenGroupingProperties
+    if hidden == grouping_props.preview_hidden or (hidden and collection.hide_viewport):
+        return
+    collection.hide_viewport = hidden
+    grouping_props.preview_hidden = hidden
+
+
+preview_scheduler = PreviewScheduler()
+
+
+@persistent
+def scheduler_cancel(*_args):
+    """Cancels pending lazy updates before undo, redo and loading a file"""
+    preview_scheduler.cancel()
+
+
+@persistent
+def scheduler_restore(*_args):
+    """Shows books that were hidden in the undo step or file that was just loaded"""
+    preview_scheduler.restore_books()
+
+
+@persistent
+def scheduler_save_pre(*_args):
+    """Shows the books of pending previews so they are not saved hidden"""
+    preview_scheduler.restore_books()
+
+
+@persistent
+def scheduler_save_post(*_args):
+    """Hides the books of pending previews again after saving"""
+    preview_scheduler.hide_dirty_books(bpy.context)
+
+
+def register_handlers():
+    """Registers the handlers that cancel pending lazy updates and restore hidden books"""
+    bpy.app.handlers.undo_pre.append(scheduler_cancel)
+    bpy.app.handlers.redo_pre.append(scheduler_cancel)
+    bpy.app.handlers.load_pre.append(scheduler_cancel)
+    bpy.app.handlers.undo_post.append(scheduler_restore)
+    bpy.app.handlers.redo_post.append(scheduler_restore)
+    bpy.app.handlers.load_post.append(scheduler_restore)
+    bpy.app.handlers.save_pre.append(scheduler_save_pre)
+    bpy.app.handlers.save_post.append(scheduler_save_post)
+
+
+def unregister_handlers():
+    """Removes the handlers, drops pending lazy updates and shows their books"""
+    bpy.app.handlers.undo_pre.remove(scheduler_cancel)
+    bpy.app.handlers.redo_pre.remove(scheduler_cancel)
+    bpy.app.handlers.load_pre.remove(scheduler_cancel)
+    bpy.app.handlers.undo_post.remove(scheduler_restore)
+    bpy.app.handlers.redo_post.remove(scheduler_restore)
+    bpy.app.handlers.load_post.remove(scheduler_restore)
+    bpy.app.handlers.save_pre.remove(scheduler_save_pre)
+    bpy.app.handlers.save_post.remove(scheduler_save_post)
+    preview_scheduler.cancel()
@@ -5,9 +5,13 @@ import logging
 
 import bpy
 
+from .core import ShelfSequence
+from .profiling import profiled_modal
+from .registry import invalidate_registry
 from .shelf import Shelf
 from .utils import (
     compose_grouping_name,
+    get_grouping_hash,
     get_shelf_parameters,
     get_shelf_collection,
     get_click_position_on_object,
@@ -52,6 +56,8 @@ class BOOKGEN_OT_SelectShelf(bpy.types.Operator):
         self.gizmo = None
         self.outline = None
         self.limit_line = None
+        self.sequence = None
+        self.profile_session = None
 
     @classmethod
     def poll(cls, context):
@@ -72,6 +78,7 @@ class BOOKGEN_OT_SelectShelf(bpy.types.Operator):
                 return True
         return False
 
+    @profiled_modal("select_shelf")
     def modal(self, context, event):
         """Handle modal events
 
@@ -146,8 +153,7 @@ class BOOKGEN_OT_SelectShelf(bpy.types.Operator):
         normal = (self.start_normal + self.end_normal) / 2
         shelf_name = compose_grouping_name(context, "shelf", shelf_id)
         shelf = Shelf(shelf_name, self.start, self.end, normal, parameters)
-        shelf.clean(context)
-        shelf.fill()
+        shelf.fill(self.get_sequence(parameters))
 
         # set properties for later rebuild
         shelf_props = get_shelf_collection(context, shelf.name).BookGenGroupingProperties
@@ -157,10 +163,12 @@ class BOOKGEN_OT_SelectShelf(bpy.types.Operator):
         shelf_props.id = shelf_id
         shelf_props.grouping_type = "SHELF"
         shelf_props.settings_name = settings_name
+        invalidate_registry(context.scene)
         self.gizmo.remove()
         self.outline.disable_outline()
         self.limit_line.remove()
         shelf.to_collection(context, with_uvs=True)
+        shelf_props.content_hash = get_grouping_hash(shelf_props, parameters)
 
         index = get_grouping_index_by_name(context, shelf.name)
 
@@ -225,6 +233,20 @@ class BOOKGEN_OT_SelectShelf(bpy.types.Operator):
         context.workspace.status_text_set("Click on a surface to start placing the shelf")
         return {"RUNNING_MODAL"}
 
+    def get_sequence(self, parameters):
+        """Returns the books sampled for previous previews as long as the parameters did not change.
+        Resizing the shelf then only samples the books that were not needed before.
+
+        Args:
+            parameters (Dict[str, any]): the parameters of the shelf
+
+        Returns:
+            ShelfSequence: the sampled books
+        """
+        if self.sequence is None or not self.sequence.matches(parameters):
+            self.sequence = ShelfSequence(parameters)
+        return self.sequence
+
     def refresh_preview(self, context):
         """
         Collect the current parameters of the shelf,
@@ -244,7 +266,7 @@ class BOOKGEN_OT_SelectShelf(bpy.types.Operator):
         shelf_name = compose_grouping_name(context, "shelf", shelf_id)
 
         shelf = Shelf(shelf_name, self.start, self.end, normal, parameters)
-        shelf.fill()
+        shelf.fill(self.get_sequence(parameters))
         self.gizmo.update(self.start, self.end, normal)
 
         self.outline.enable_outline(*shelf.get_geometry(), context)
@@ -9,10 +9,14 @@ import bpy_extras
 import mathutils
 
 
+from .core import StackSequence
+from .profiling import profiled_modal
+from .registry import invalidate_registry
 from .stack import Stack
 from .ui_stack_gizmo import BookGenStackGizmo
 from .utils import (
     compose_grouping_name,
+    get_grouping_hash,
     project_to_screen,
     get_click_position_on_object,
     get_free_stack_id,
@@ -55,6 +59,8 @@ class BOOKGEN_OT_SelectStack(bpy.types.Operator):
         self.origin_normal_2d = None
         self.origin_2d = None
         self.gizmo = None
+        self.sequence = None
+        self.profile_session = None
 
     @classmethod
     def poll(cls, context):
@@ -75,6 +81,7 @@ class BOOKGEN_OT_SelectStack(bpy.types.Operator):
                 return True
         return False
 
+    @profiled_modal("select_stack")
     def modal(self, context, event):
         """Handle modal events
 
@@ -194,8 +201,7 @@ class BOOKGEN_OT_SelectStack(bpy.types.Operator):
 
         stack_name = compose_grouping_name(context, "stack", stack_id)
         stack = Stack(stack_name, self.origin, self.forward, self.origin_normal, self.height, parameters)
-        stack.clean(context)
-        stack.fill()
+        stack.fill(self.get_sequence(parameters))
 
         # set properties for later rebuild
         stack_props = get_shelf_collection(context, stack.name).BookGenGroupingProperties
@@ -206,9 +212,11 @@ class BOOKGEN_OT_SelectStack(bpy.types.Operator):
         stack_props.id = stack_id
         stack_props.grouping_type = "STACK"
         stack_props.settings_name = settings_name
+        invalidate_registry(context.scene)
 
         self.disable_preview()
         stack.to_collection(context, with_uvs=True)
+        stack_props.content_hash = get_grouping_hash(stack_props, parameters)
 
         index = get_grouping_index_by_name(context, stack.name)
 
@@ -258,6 +266,20 @@ class BOOKGEN_OT_SelectStack(bpy.types.Operator):
         self.gizmo.remove()
         self.outline.disable_outline()
 
+    def get_sequence(self, parameters):
+        """Returns the books sampled for previous previews as long as the parameters did not change.
+        Resizing the stack then only samples the books that were not needed before.
+
+        Args:
+            parameters (Dict[str, any]): the parameters of the stack
+
+        Returns:
+            StackSequence: the sampled books
+        """
+        if self.sequence is None or not self.sequence.matches(parameters):
+            self.sequence = StackSequence(parameters)
+        return self.sequence
+
     def refresh_preview(self, context, mouse_x, mouse_y):
         """
         Collect the current parameters of the stack,
@@ -294,7 +316,7 @@ class BOOKGEN_OT_SelectStack(bpy.types.Operator):
         parameters = get_stack_parameters(context, stack_id, settings)
         stack_name = compose_grouping_name(context, "stack", stack_id)
         stack = Stack(stack_name, self.origin, self.forward, self.origin_normal, self.height, parameters)
-        stack.fill()
+        stack.fill(self.get_sequence(parameters))
         self.outline.enable_outline(*stack.get_geometry(), context)
 
         self.gizmo.update(self.origin, self.forward, self.origin_normal, self.height)
@@ -2,6 +2,8 @@
 Contains a class for drawing a transparent shelf overlay
 """
 
+import numpy as np
+
 import bpy
 import gpu
 from gpu_extras.batch import batch_for_shader
@@ -29,15 +31,13 @@ class BookGenShelfOutline:
         """Updates the axis constraint visualization based on the current configuration
 
         Args:
-            vertices (List[mathutils.Vector]): the vertices of the shelf overlay
-            faces (List[mathutils.Vector]): the face indices of the shelf overlay
+            vertices (numpy.ndarray): the vertices of the shelf overlay
+            faces (numpy.ndarray): the face indices of the shelf overlay
         """
         col_ref = context.preferences.themes[0].view_3d.face_select
         self.outline_color = (col_ref[0], col_ref[1], col_ref[2], 0.3)
-        indices = []
-        for face in faces:
-            indices.append((face[0], face[1], face[2]))
-            indices.append((face[0], face[2], face[3]))
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        indices = np.ascontiguousarray(np.asarray(faces, dtype=np.int32)[:, (0, 1, 2, 0, 2, 3)].reshape(-1, 3))
 
         self.batch = batch_for_shader(self.shader, "TRIS", {"pos": vertices}, indices=indices)
 
@@ -45,8 +45,8 @@ class BookGenShelfOutline:
         """Enables the shelf overlay
 
         Args:
-            vertices (List[mathutils.Vector]): the vertices of the shelf overlay
-            faces (List[mathutils.Vector]): the face indices of the shelf overlay
+            vertices (numpy.ndarray): the vertices of the shelf overlay
+            faces (numpy.ndarray): the face indices of the shelf overlay
             context (bpy.types.Context): the execution context
         """
         if self.draw_handler is None:
@@ -4,11 +4,12 @@ Contains the class for drawing a preview of a book grouping
 
 import logging
 
+import numpy as np
+
 import bpy
 import gpu
 from gpu.types import GPUShaderCreateInfo, GPUStageInterfaceInfo
 from gpu_extras.batch import batch_for_shader
-from mathutils import Vector
 
 from .utils import bookGen_directory
 
@@ -74,19 +75,22 @@ class BookGenShelfPreview:
         """Updates the vertices and faces of the preview
 
         Args:
-            verts (List[Vector]): vertices of the mesh to preview in world-space
-            faces (List[Vector]): faces indices of the mesh to preview
+            verts (numpy.ndarray): vertices of the mesh to preview in world-space
+            faces (numpy.ndarray): faces indices of the mesh to preview
             context (bpy.types.Context): the blender context in which the preview is drawn
         """
 
-        normals = []
-        vertices = []
-        for f in faces:
-            vertices += [verts[f[0]], verts[f[1]], verts[f[2]], verts[f[0]], verts[f[2]], verts[f[3]]]
-            a = Vector(verts[f[1]]) - Vector(verts[f[0]])
-            b = Vector(verts[f[2]]) - Vector(verts[f[0]])
-            nrm = (a.cross(b)).normalized()
-            normals += [nrm] * 6
+        verts = np.asarray(verts, dtype=np.float32)
+        faces = np.asarray(faces, dtype=np.int32)
+
+        a = verts[faces[:, 1]] - verts[faces[:, 0]]
+        b = verts[faces[:, 2]] - verts[faces[:, 0]]
+        face_normals = np.cross(a, b)
+        lengths = np.linalg.norm(face_normals, axis=1, keepdims=True)
+        face_normals /= np.where(lengths > 0, lengths, 1)
+
+        vertices = np.ascontiguousarray(verts[faces[:, (0, 1, 2, 0, 2, 3)].reshape(-1)])
+        normals = np.ascontiguousarray(np.repeat(face_normals, 6, axis=0))
 
         self.batch = batch_for_shader(self.shader, "TRIS", {"pos": vertices, "nrm": normals})
 
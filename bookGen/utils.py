@@ -3,11 +3,26 @@ TODO split this file.
 """
 
 import os
+import time
+import logging
+import hashlib
 
 import bpy
 import bpy_extras.view3d_utils
 from mathutils import Vector
 
+from .core.stats import measure
+from .registry import (
+    find_grouping,
+    find_grouping_index,
+    find_groupings_by_settings,
+    find_settings,
+    invalidate_registry,
+    is_grouping_name_used,
+)
+
+log = logging.getLogger("bookGen.utils")
+
 bookgen_version = None
 
 def get_bookgen_version():
@@ -80,12 +95,13 @@ def get_shelf_collection(context, name):  # TODO make name generic
         bpy.types.Collection: the shelf collection or None
     """
     bookgen = get_bookgen_collection(context)
-    for collection in bookgen.children:
-        if collection.name == name:
-            return collection
+    collection = find_grouping(context.scene, name)
+    if collection is not None:
+        return collection
 
     col = bpy.data.collections.new(name)
     bookgen.children.link(col)
+    invalidate_registry(context.scene)
     return col
 
 
@@ -104,6 +120,117 @@ def get_shelf_collection_by_index(context, index, create=False):
     return bookGen.children[index]
 
 
+def get_grouping_datablocks(collection):
+    """Gathers the datablocks that were created for the books of a grouping.
+    Meshes that are shared between multiple books are only returned once.
+
+    Args:
+        collection (bpy.types.Collection): the collection of the grouping
+
+    Returns:
+        List[bpy.types.ID]: the book objects, their meshes and for instanced groupings
+            the archetype collection, the archetype objects and the generated node groups
+    """
+    datablocks = {}
+
+    def gather(datablock):
+        if datablock is not None:
+            datablocks[datablock.as_pointer()] = datablock
+
+    archetypes = collection.BookGenGroupingProperties.archetypes
+    gather(archetypes)
+
+    for books in (collection, archetypes):
+        if books is None:
+            continue
+        for obj in books.objects:
+            gather(obj)
+            gather(obj.data)
+            for modifier in obj.modifiers:
+                if modifier.type == "NODES":
+                    gather(modifier.node_group)
+
+    return list(datablocks.values())
+
+
+def remove_grouping_books(*collections):
+    """Removes all books of one or more groupings including their meshes.
+    For instanced groupings the archetypes and the generated node groups are removed as well.
+    All datablocks are gathered first and removed with a single call to bpy.data.batch_remove.
+
+    Args:
+        collections (bpy.types.Collection): the collections of the groupings
+
+    Returns:
+        int: the number of removed datablocks
+    """
+    time_start = time.time()
+    datablocks = []
+    with measure("cleanup"):
+        for collection in collections:
+            datablocks.extend(get_grouping_datablocks(collection))
+            collection.BookGenGroupingProperties.archetypes = None
+            collection.BookGenGroupingProperties.content_hash = ""
+
+        bpy.data.batch_remove(datablocks)
+
+    log.info("Removed %d datablocks in %.4f secs", len(datablocks), time.time() - time_start)
+    return len(datablocks)
+
+
+def new_staging_collection(collection):
+    """Creates an empty collection to build the books of a grouping in.
+    It is not linked to the scene so the depsgraph ignores it until it is swapped in.
+
+    Args:
+        collection (bpy.types.Collection): the collection of the grouping
+
+    Returns:
+        bpy.types.Collection: the staging collection
+    """
+    return bpy.data.collections.new(collection.name + ".staging")
+
+
+def discard_staging_collection(staging):
+    """Removes a staging collection and everything that was built in it
+
+    Args:
+        staging (bpy.types.Collection): the staging collection
+    """
+    remove_grouping_books(staging)
+    bpy.data.collections.remove(staging)
+
+
+def swap_grouping_books(collection, staging):
+    """Moves the books that were built in a staging collection to the collection of a grouping.
+    The books of the grouping have to be removed before building, so the new ones already have their final names.
+
+    Args:
+        collection (bpy.types.Collection): the collection of the grouping
+        staging (bpy.types.Collection): the staging collection. It is removed afterwards.
+    """
+    with measure("linking"):
+        for obj in staging.objects:
+            collection.objects.link(obj)
+        collection.BookGenGroupingProperties.archetypes = staging.BookGenGroupingProperties.archetypes
+        bpy.data.collections.remove(staging)
+
+
+def rename_grouping(collection, name):
+    """Renames a grouping and the datablocks of its books that are named after it,
+    so that a new grouping can reuse the previous name without clashing with them.
+
+    Args:
+        collection (bpy.types.Collection): the collection of the grouping
+        name (str): the new name
+    """
+    previous_name = collection.name
+    collection.name = name
+    for datablock in get_grouping_datablocks(collection):
+        if datablock.name.startswith(previous_name):
+            datablock.name = collection.name + datablock.name[len(previous_name) :]
+
+
 def visible_objects_and_duplis(context):
     """Loop over (object, matrix) pairs (mesh only)"""
 
@@ -161,7 +288,8 @@ def get_shelf_parameters(context, shelf_id=0, settings=None):
 
     parameters = {
         "scale": properties.scale,
-        "seed": properties.seed + shelf_id,
+        "seed": properties.seed,
+        "grouping_id": shelf_id,
         "alignment": properties.alignment,
         "lean_amount": properties.lean_amount,
         "lean_direction": properties.lean_direction,
@@ -184,12 +312,35 @@ def get_shelf_parameters(context, shelf_id=0, settings=None):
         "hinge_width": properties.hinge_width,
         "rndm_hinge_width_factor": properties.rndm_hinge_width_factor,
         "subsurf": properties.subsurf,
+        "output_mode": properties.output_mode,
+        "archetype_tolerance": properties.archetype_tolerance,
         "cover_material": properties.cover_material,
         "page_material": properties.page_material,
     }
     return parameters
 
 
+def get_grouping_hash(grouping_props, parameters):
+    """Computes a hash of everything that determines the books of a grouping
+
+    Args:
+        grouping_props (BookGenGroupingProperties): the placement of the grouping
+        parameters (Dict[str, any]): the parameters of the grouping from get_shelf_parameters or get_stack_parameters
+
+    Returns:
+        str: the hash as hex digest
+    """
+    values = [grouping_props.grouping_type, grouping_props.height]
+    for name in ("start", "end", "normal", "origin", "forward"):
+        values.append(tuple(getattr(grouping_props, name)))
+    for key in sorted(parameters):
+        value = parameters[key]
+        if isinstance(value, bpy.types.ID):
+            value = value.name_full
+        values.append((key, value))
+    return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()
+
+
 def get_stack_parameters(context, shelf_id=0, settings=None):
     """Collects the parameters for a specific stack
 
@@ -206,7 +357,8 @@ def get_stack_parameters(context, shelf_id=0, settings=None):
 
     parameters = {
         "scale": properties.scale,
-        "seed": properties.seed + shelf_id,
+        "seed": properties.seed,
+        "grouping_id": shelf_id,
         "rotation": properties.rotation,
         "book_height": properties.book_height,
         "rndm_book_height_factor": properties.rndm_book_height_factor,
@@ -225,6 +377,8 @@ def get_stack_parameters(context, shelf_id=0, settings=None):
         "hinge_width": properties.hinge_width,
         "rndm_hinge_width_factor": properties.rndm_hinge_width_factor,
         "subsurf": properties.subsurf,
+        "output_mode": properties.output_mode,
+        "archetype_tolerance": properties.archetype_tolerance,
         "cover_material": properties.cover_material,
         "page_material": properties.page_material,
         "stack_top_face": properties.stack_top_face,
@@ -351,10 +505,7 @@ def get_grouping_index_by_name(context, name):
     Returns:
         int: the grouping index
     """
-    for i, c in enumerate(get_bookgen_collection(context).children):
-        if c.name == name:
-            return i
-    return -1
+    return find_grouping_index(context.scene, name)
 
 
 def compose_grouping_name(context, grouping_type, grouping_id):
@@ -371,6 +522,33 @@ def compose_grouping_name(context, grouping_type, grouping_id):
     return grouping_type + "_" + str(grouping_id) + "_" + context.scene.name
 
 
+def compose_book_name(grouping_name, index):
+    """Constructs the name of the object of a book from its grouping and its index.
+    The names are unique so blender does not have to resolve name collisions when creating books.
+
+    Args:
+        grouping_name (str): the name of the grouping
+        index (int): the index of the book in the grouping
+
+    Returns:
+        str: the name of the book e.g. shelf_1_Scene.b0421
+    """
+    return "%s.b%04d" % (grouping_name, index)
+
+
+def compose_mesh_name(grouping_name, index):
+    """Constructs the name of a mesh shared by the books of a grouping
+
+    Args:
+        grouping_name (str): the name of the grouping
+        index (int): the index of the mesh in the grouping
+
+    Returns:
+        str: the name of the mesh e.g. shelf_1_Scene.m0012
+    """
+    return "%s.m%04d" % (grouping_name, index)
+
+
 def get_free_shelf_id(context):
     """Finds the next unused shelf id
 
@@ -398,14 +576,10 @@ def get_free_id(context, grouping_type: str):
     Returns:
         int: the next unused id
     """
-    groupings = get_bookgen_collection(context).children
-
-    names = list(map(lambda x: x.name, groupings))
     element_id = 0
-    while True:
-        if compose_grouping_name(context, grouping_type, element_id) not in names:
-            return element_id
+    while is_grouping_name_used(context.scene, compose_grouping_name(context, grouping_type, element_id)):
         element_id += 1
+    return element_id
 
 
 def get_active_grouping(context, create=True):
@@ -430,11 +604,7 @@ def get_active_settings(context, create=True):
     collection = get_active_grouping(context, create)
     if collection is None:
         return None
-    settings_name = collection.BookGenGroupingProperties.settings_name
-    for settings in context.scene.BookGenSettings:
-        if settings.name == settings_name:
-            return settings
-    return None
+    return get_settings_by_name(context, collection.BookGenGroupingProperties.settings_name)
 
 
 def get_settings_by_name(context, name):
@@ -447,10 +617,20 @@ def get_settings_by_name(context, name):
     Returns:
         BookGenProperties: the settings or None
     """
-    for settings in context.scene.BookGenSettings:
-        if settings.name == name:
-            return settings
-    return None
+    return find_settings(context.scene, name)
+
+
+def get_groupings_by_settings(context, settings_name):
+    """Retrieve the collections of all groupings that use the given settings
+
+    Args:
+        context (bpy.types.Context): the execution context
+        settings_name (str): the name of the settings
+
+    Returns:
+        List[bpy.types.Collection]: the collections of the groupings
+    """
+    return find_groupings_by_settings(context.scene, settings_name)
 
 
 def get_settings_for_new_grouping(context):
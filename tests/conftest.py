@@ -0,0 +1,35 @@
+"""
+Shared fixtures of the tests of bookGen.core. The core does not depend on blender, so the tests run in plain python.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    """Returns the parameters of a shelf with all randomization enabled"""
+    return {
+        "scale": 1.0,
+        "seed": 7,
+        "grouping_id": 3,
+        "lean_amount": 0.5,
+        "lean_direction": 0.0,
+        "lean_angle": 0.3,
+        "rndm_lean_angle_factor": 1.0,
+        "book_height": 0.2,
+        "rndm_book_height_factor": 1.0,
+        "book_width": 0.04,
+        "rndm_book_width_factor": 1.0,
+        "book_depth": 0.12,
+        "rndm_book_depth_factor": 1.0,
+        "cover_thickness": 0.002,
+        "rndm_cover_thickness_factor": 1.0,
+        "textblock_offset": 0.005,
+        "rndm_textblock_offset_factor": 1.0,
+        "spine_curl": 0.002,
+        "rndm_spine_curl_factor": 1.0,
+        "hinge_inset": 0.001,
+        "rndm_hinge_inset_factor": 1.0,
+        "hinge_width": 0.004,
+        "rndm_hinge_width_factor": 1.0,
+    }
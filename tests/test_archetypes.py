@@ -0,0 +1,41 @@
+"""
+Tests the clustering of books into archetypes.
+"""
+
+import numpy as np
+import pytest
+
+from bookGen.core import BookBatch, BookStreams, find_archetypes, sample_books
+
+
+@pytest.fixture
+def batch(parameters):
+    books = sample_books(parameters, BookStreams(parameters["seed"]), np.arange(500))
+    return BookBatch.from_books(books, np.zeros((500, 3)), np.broadcast_to(np.identity(3), (500, 3, 3)))
+
+
+def get_error(batch, archetypes):
+    """Returns the largest distance between a vertex of a book and the vertex of its scaled archetype"""
+    vertices = archetypes.batch.vertices[archetypes.indices] * archetypes.scales[:, np.newaxis, :]
+    return np.abs(vertices - batch.vertices).max()
+
+
+def test_zero_tolerance_only_merges_identical_books(batch):
+    archetypes = find_archetypes(batch, 0.0)
+    assert len(archetypes) == len(np.unique(batch.parameters, axis=0))
+    np.testing.assert_array_equal(archetypes.scales, 1)
+    np.testing.assert_array_equal(archetypes.batch.vertices[archetypes.indices], batch.vertices)
+
+
+@pytest.mark.parametrize("tolerance", [0.0005, 0.002, 0.01])
+def test_error_is_bounded_by_tolerance(batch, tolerance):
+    archetypes = find_archetypes(batch, tolerance)
+    assert len(archetypes.indices) == len(batch)
+    # the books are stored as float32
+    assert get_error(batch, archetypes) <= tolerance + 1e-6
+
+
+def test_larger_tolerance_shares_more(batch):
+    counts = [len(find_archetypes(batch, tolerance)) for tolerance in (0.0005, 0.002, 0.01)]
+    assert counts[0] >= counts[1] >= counts[2]
+    assert counts[2] < len(batch)
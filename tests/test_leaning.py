@@ -0,0 +1,198 @@
+"""
+Compares the vectorized shelf and stack layout of bookGen.core with the scalar loops it replaced.
+The loops below are the original ones, only reading the sampled books instead of drawing them.
+
+The number of books has to match exactly. numpy.tan may differ from math.tan in the last bit,
+so the offsets of shelves are compared with a tolerance of a few ulp. Picking a wrong leaning case
+is off by orders of magnitude more than that.
+"""
+
+from math import cos, radians, sin, tan
+
+import numpy as np
+import pytest
+
+from bookGen.core import ShelfSequence, StackSequence
+
+SHELF_COUNT = 1200
+RELATIVE_TOLERANCE = 1e-14
+
+
+def get_parameters(rng, index):
+    """Returns random grouping parameters. The leaning settings cover all five cases of the shelf layout."""
+    return {
+        "scale": 1.0,
+        "seed": int(rng.integers(0, 2**31)),
+        "grouping_id": index,
+        "lean_amount": float(rng.choice([0.0, 0.5, 1.0, rng.random()])),
+        "lean_direction": float(rng.uniform(-1, 1)),
+        "lean_angle": radians(float(rng.uniform(0, 30))),
+        "rndm_lean_angle_factor": float(rng.random()),
+        "book_height": 0.15 + 0.1 * float(rng.random()),
+        "rndm_book_height_factor": float(rng.random()),
+        "book_width": 0.02 + 0.04 * float(rng.random()),
+        "rndm_book_width_factor": float(rng.random()),
+        "book_depth": 0.12,
+        "rndm_book_depth_factor": 1.0,
+        "cover_thickness": 0.002,
+        "rndm_cover_thickness_factor": float(rng.random()),
+        "textblock_offset": 0.005,
+        "rndm_textblock_offset_factor": 1.0,
+        "spine_curl": 0.002,
+        "rndm_spine_curl_factor": 1.0,
+        "hinge_inset": 0.001,
+        "rndm_hinge_inset_factor": 1.0,
+        "hinge_width": 0.004,
+        "rndm_hinge_width_factor": 1.0,
+    }
+
+
+def corners(angle, height, width, left_raised):
+    """Returns the left and right corner height of a book like the scalar loop"""
+    upright = cos(angle) * height
+    raised = upright + sin(abs(angle)) * width
+    return (raised, upright) if left_raised else (upright, raised)
+
+
+def reference_shelf(angles, heights, widths, length):
+    """The scalar shelf loop
+
+    Returns:
+        (List[float], bool): the offsets of the books and False if the loop hit an unusual case
+    """
+    if angles[0] >= 0:
+        cur_offset = cos(angles[0]) * widths[0]
+    else:
+        cur_offset = heights[0] * sin(abs(angles[0]))
+    offsets = [cur_offset]
+    cur_width = 0
+
+    index = 0
+    while cur_width < length:
+        index += 1
+        if index == len(angles):
+            return None, True
+        last = [angles[index - 1], heights[index - 1], widths[index - 1]]
+        current = [angles[index], heights[index], widths[index]]
+        last += corners(*last, left_raised=last[0] > 0)
+        current += corners(*current, left_raised=not current[0] < 0)
+
+        same_dir = (last[0] >= 0 and current[0] >= 0) or (last[0] < 0 and current[0] < 0)
+
+        def switch(a, b):
+            a[3], a[4] = a[4], a[3]
+            b[3], b[4] = b[4], b[3]
+            return b, a
+
+        if same_dir and last[0] < 0:
+            current, last = switch(current, last)
+
+        l_angle, l_height, l_width, _, l_right = last
+        c_angle, _, c_width, c_left, _ = current
+        if same_dir and abs(l_angle) >= abs(c_angle) and l_right <= c_left:
+            offset = sin(abs(l_angle)) * l_height - (tan(abs(c_angle)) * l_right - c_width / cos(abs(c_angle)))
+        elif same_dir and abs(l_angle) >= abs(c_angle) and l_right > c_left:
+            offset = (
+                c_left / tan(radians(90) - abs(l_angle))
+                - (c_left / tan(radians(90) - abs(c_angle)))
+                + c_width / cos(abs(c_angle))
+            )
+        elif not same_dir and l_angle > c_angle:
+            if l_right > c_left:
+                current, last = switch(current, last)
+            l_angle, l_height, _, _, l_right = last
+            c_angle = current[0]
+            offset = cos(radians(90) - abs(l_angle)) * l_height + l_right / tan(radians(90) - abs(c_angle))
+        elif not same_dir and l_angle < c_angle:
+            offset = sin(radians(90) - abs(l_angle)) * l_width - (
+                tan(abs(c_angle)) * sin(abs(l_angle)) * l_width - c_width / cos(abs(c_angle))
+            )
+        elif same_dir and abs(l_angle) < abs(c_angle):
+            offset = (cos(c_angle) * c_width) + (sin(c_angle) * c_width / tan(radians(90) - l_angle))
+        else:
+            return offsets, False
+
+        angle, height, width = angles[index], heights[index], widths[index]
+        if angle > 0:
+            extent = offset + sin(abs(angle)) * height
+        elif angle < 0:
+            extent = offset + cos(angle) * width
+        else:
+            extent = offset
+
+        cur_width = cur_offset + extent
+        cur_offset += offset
+        if cur_width < length:
+            offsets.append(cur_offset)
+    return offsets, True
+
+
+def reference_stack(widths, height):
+    """The scalar stack loop
+
+    Returns:
+        List[float]: the offsets of the books or None if more books are needed
+    """
+    cur_offset = widths[0] / 2
+    offsets = [cur_offset]
+    cur_height = 0
+    index = 0
+    while cur_height < height:
+        index += 1
+        if index == len(widths):
+            return None
+        cur_height = cur_offset + widths[index]
+        cur_offset += widths[index] / 2 + widths[index - 1] / 2
+        if cur_height < height:
+            offsets.append(cur_offset)
+    return offsets
+
+
+def reference_books(sequence, reference, *args):
+    """Runs a reference loop on the books of a sequence and samples more books until it finishes"""
+    count = max(sequence.count, 1)
+    while True:
+        books = sequence.get(count)
+        result = reference(books, *args)
+        if result is not None:
+            return result
+        count *= 2
+
+
+@pytest.mark.parametrize("index", range(SHELF_COUNT))
+def test_shelf_matches_scalar_loop(index):
+    rng = np.random.default_rng(index)
+    parameters = get_parameters(rng, index)
+    length = float(rng.uniform(0.05, 3.0))
+
+    sequence = ShelfSequence(parameters)
+    count, offsets = sequence.fit(length)
+
+    def reference(books, length):
+        angles = books["lean_angle"].tolist()
+        widths = (books["page_thickness"] + 2 * books["cover_thickness"]).tolist()
+        result, usual = reference_shelf(angles, books["cover_height"].tolist(), widths, length)
+        return None if result is None else (result, usual)
+
+    expected, usual = reference_books(sequence, reference, length)
+    assert usual == bool(sequence.valid[count - 1])
+    assert count == len(expected)
+    np.testing.assert_allclose(offsets, expected, rtol=RELATIVE_TOLERANCE, atol=0)
+
+
+@pytest.mark.parametrize("index", range(SHELF_COUNT // 4))
+def test_stack_matches_scalar_loop(index):
+    rng = np.random.default_rng(index)
+    parameters = get_parameters(rng, index)
+    del parameters["lean_amount"]
+    height = float(rng.uniform(0.01, 1.5))
+
+    sequence = StackSequence(parameters)
+    count, offsets = sequence.fit(height)
+
+    def reference(books, height):
+        return reference_stack((books["page_thickness"] + 2 * books["cover_thickness"]).tolist(), height)
+
+    expected = reference_books(sequence, reference, height)
+    assert count == len(expected)
+    np.testing.assert_array_equal(offsets, expected)
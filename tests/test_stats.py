@@ -0,0 +1,88 @@
+"""
+Tests the timing of the phases of a rebuild.
+"""
+
+import json
+
+import pytest
+
+from bookGen.core import stats
+
+
+class Clock:
+    """A clock that only advances when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(stats.time, "perf_counter", clock)
+    return clock
+
+
+def test_nested_phases_are_exclusive(clock):
+    grouping = stats.start_rebuild().add_grouping("Shelf_1")
+    with stats.record(grouping):
+        with stats.measure("fill"):
+            clock.now += 1
+            with stats.measure("sampling"):
+                clock.now += 2
+            clock.now += 3
+        with stats.measure("to_object"):
+            clock.now += 4
+
+    assert grouping.phases["fill"] == 4
+    assert grouping.phases["sampling"] == 2
+    assert grouping.phases["to_object"] == 4
+    assert grouping.total == 10
+
+
+def test_phases_outside_of_record_are_ignored(clock):
+    grouping = stats.start_rebuild().add_grouping("Shelf_1")
+    with stats.measure("fill"):
+        clock.now += 1
+    with stats.record(grouping):
+        pass
+    with stats.measure("fill"):
+        clock.now += 1
+    assert grouping.total == 0
+
+
+def test_phases_are_recorded_per_grouping(clock):
+    rebuild = stats.start_rebuild()
+    first = rebuild.add_grouping("Shelf_1")
+    second = rebuild.add_grouping("Stack_1")
+    with stats.record(first):
+        with stats.measure("fill"):
+            clock.now += 1
+    with stats.record(second):
+        with stats.measure("fill"):
+            clock.now += 2
+
+    assert first.phases["fill"] == 1
+    assert second.phases["fill"] == 2
+    assert stats.get_last_rebuild() is rebuild
+
+
+def test_write_json(clock, tmp_path):
+    rebuild = stats.start_rebuild()
+    grouping = rebuild.add_grouping("Shelf_1")
+    grouping.books = 3
+    grouping.vertices = 132
+    with stats.record(grouping):
+        with stats.measure("cleanup"):
+            clock.now += 0.5
+
+    filepath = tmp_path / "stats.json"
+    rebuild.write_json(str(filepath))
+    data = json.loads(filepath.read_text())
+    assert data["books"] == 3
+    assert data["vertices"] == 132
+    assert data["total"] == 0.5
+    assert data["groupings"][0]["phases"]["cleanup"] == 0.5
@@ -0,0 +1,72 @@
+"""
+Tests the per-book random streams of bookGen.core and the sampling on top of them.
+"""
+
+import numpy as np
+
+from bookGen.core import BookStreams, ShelfSequence, sample_books
+from bookGen.core.sampling import DRAWS_PER_BOOK
+
+
+def test_random_access_matches_sequential():
+    streams = BookStreams(7, 3)
+    sequential = streams.uniforms(np.arange(100), DRAWS_PER_BOOK)
+    indices = np.array([97, 3, 42, 0, 42])
+    np.testing.assert_array_equal(streams.uniforms(indices, DRAWS_PER_BOOK), sequential[indices])
+
+
+def test_uniforms_are_in_unit_interval():
+    uniforms = BookStreams(1, 0).uniforms(np.arange(10000), DRAWS_PER_BOOK)
+    assert uniforms.min() >= 0
+    assert uniforms.max() < 1
+    assert abs(uniforms.mean() - 0.5) < 0.01
+
+
+def test_streams_depend_on_seed_and_grouping():
+    indices = np.arange(10)
+    reference = BookStreams(7, 3).uniforms(indices, DRAWS_PER_BOOK)
+    assert not np.any(BookStreams(8, 3).uniforms(indices, DRAWS_PER_BOOK) == reference)
+    assert not np.any(BookStreams(7, 4).uniforms(indices, DRAWS_PER_BOOK) == reference)
+
+
+def test_chunks_match_single_call(parameters):
+    streams = BookStreams(parameters["seed"], parameters["grouping_id"])
+    whole = sample_books(parameters, streams, np.arange(60))
+    chunks = [sample_books(parameters, streams, np.arange(start, start + 20)) for start in (0, 20, 40)]
+    for key, values in whole.items():
+        np.testing.assert_array_equal(np.concatenate([chunk[key] for chunk in chunks]), values)
+
+
+def test_short_grouping_is_prefix_of_long_grouping(parameters):
+    short = ShelfSequence(parameters)
+    short_count, short_offsets = short.fit(0.5)
+    long = ShelfSequence(parameters)
+    long_count, long_offsets = long.fit(3.0)
+
+    assert short_count < long_count
+    np.testing.assert_array_equal(long_offsets[:short_count], short_offsets)
+    for key, values in short.get(short_count).items():
+        np.testing.assert_array_equal(long.get(short_count)[key], values)
+
+
+def test_variant_rerolls_only_its_book(parameters):
+    streams = BookStreams(parameters["seed"], parameters["grouping_id"])
+    indices = np.arange(20)
+    variants = np.zeros(20, dtype=int)
+    books = sample_books(parameters, streams, indices, variants)
+
+    variants[5] = 1
+    rerolled = sample_books(parameters, streams, indices, variants)
+
+    others = indices != 5
+    for key, values in books.items():
+        np.testing.assert_array_equal(rerolled[key][others], values[others])
+    assert rerolled["cover_height"][5] != books["cover_height"][5]
+    assert rerolled["page_thickness"][5] != books["page_thickness"][5]
+
+
+def test_default_variant_is_zero():
+    streams = BookStreams(1, 2)
+    np.testing.assert_array_equal(
+        streams.uniforms(np.arange(8), DRAWS_PER_BOOK), streams.uniforms(np.arange(8), DRAWS_PER_BOOK, 0)
+    )
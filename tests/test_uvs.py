@@ -0,0 +1,58 @@
+"""
+Tests the quantized cache of uv layouts.
+"""
+
+import numpy as np
+
+from bookGen.core import GEOMETRY_PARAMETERS, UVCache, compute_uvs
+from bookGen.core.topology import LOOP_COUNT
+
+BOOK = np.array([0.2, 0.002, 0.12, 0.195, 0.115, 0.036, 0.002, 0.001, 0.004])
+
+
+def test_parameter_order():
+    assert len(BOOK) == len(GEOMETRY_PARAMETERS)
+
+
+def test_books_in_one_quantum_share_the_layout():
+    cache = UVCache(quantum=1e-3)
+    books = np.stack((BOOK, BOOK + 1e-4, BOOK - 1e-4))
+    uvs = cache.get_uvs(books)
+
+    assert uvs.shape == (3, LOOP_COUNT, 2)
+    assert len(cache.layouts) == 1
+    np.testing.assert_array_equal(uvs[1], uvs[0])
+    np.testing.assert_array_equal(uvs[2], uvs[0])
+
+
+def test_layout_is_the_one_of_the_rounded_dimensions():
+    quantum = 1e-3
+    books = np.stack((BOOK, BOOK * 1.1))
+    rounded = np.round(books / quantum) * quantum
+    np.testing.assert_allclose(UVCache(quantum).get_uvs(books), compute_uvs(rounded), atol=1e-6)
+
+
+def test_default_quantum_is_close_to_exact_uvs():
+    books = BOOK * np.linspace(0.8, 1.2, 50)[:, np.newaxis]
+    np.testing.assert_allclose(UVCache().get_uvs(books), compute_uvs(books), atol=1e-3)
+
+
+def test_cached_layouts_are_reused():
+    cache = UVCache(quantum=1e-3)
+    first = cache.get_uvs(np.stack((BOOK, BOOK * 1.1)))
+    layouts = dict(cache.layouts)
+    second = cache.get_uvs(np.stack((BOOK * 1.1, BOOK)))
+
+    assert cache.layouts.keys() == layouts.keys()
+    np.testing.assert_array_equal(second, first[::-1])
+
+
+def test_cache_is_cleared_at_max_size():
+    cache = UVCache(quantum=1e-3, max_size=2)
+    cache.get_uvs(np.stack((BOOK, BOOK * 1.1)))
+    cache.get_uvs(BOOK * 1.2)
+    assert len(cache.layouts) == 1
+
+
+def test_empty():
+    assert UVCache().get_uvs(np.zeros((0, len(BOOK)))).shape == (0, LOOP_COUNT, 2)